@@ -1,15 +1,175 @@
-from flask import Flask, request, jsonify 
-import llama_cpp 
+from flask import Flask, Response, request, jsonify
+from collections import OrderedDict
+import threading
+import json
+import os
+import llama_cpp
 
-app = Flask(__name__) 
-model = llama_cpp.Llama("llama-2-7b-chat.Q2_K.gguf") 
+app = Flask(__name__)
+model = llama_cpp.Llama(os.getenv("MODEL_PATH", "llama-2-7b-chat.Q2_K.gguf"))
 
-@app.route('/predict', methods=['POST']) 
+# llama.cpp state is not safe to share between concurrent requests
+model_lock = threading.Lock()
+
+# Prompt-prefix cache settings (LRU, bounded by total state size)
+PROMPT_CACHE_MAX_BYTES = int(os.getenv("PROMPT_CACHE_MAX_BYTES", 2 << 30))
+PROMPT_CACHE_MAX_ENTRIES = int(os.getenv("PROMPT_CACHE_MAX_ENTRIES", 16))
+
+# Generation limits; requests may lower max_tokens but not exceed the cap
+DEFAULT_MAX_TOKENS = int(os.getenv("DEFAULT_MAX_TOKENS", 1000))
+MAX_TOKENS_LIMIT = int(os.getenv("MAX_TOKENS_LIMIT", 2048))
+
+
+class PrefixStateCache:
+    """LRU cache of llama.cpp model state keyed by the system-prompt prefix"""
+
+    def __init__(self, max_bytes, max_entries):
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.states = OrderedDict()
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.saved_tokens = 0
+
+    def get(self, prefix):
+        state = self.states.get(prefix)
+        if state is None:
+            self.misses += 1
+            return None
+        self.states.move_to_end(prefix)
+        self.hits += 1
+        return state
+
+    @staticmethod
+    def state_bytes(state):
+        # The KV cache blob plus the token and logit arrays copied into each saved state
+        return state.llama_state_size + state.input_ids.nbytes + state.scores.nbytes
+
+    def put(self, prefix, state):
+        size = self.state_bytes(state)
+        if size > self.max_bytes or self.max_entries <= 0:
+            return
+        if prefix in self.states:
+            self.total_bytes -= self.state_bytes(self.states.pop(prefix))
+        while self.states and (self.total_bytes + size > self.max_bytes or len(self.states) >= self.max_entries):
+            _, evicted = self.states.popitem(last=False)
+            self.total_bytes -= self.state_bytes(evicted)
+        self.states[prefix] = state
+        self.total_bytes += size
+
+    def stats(self):
+        return {
+            'entries': len(self.states),
+            'bytes': self.total_bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'saved_tokens': self.saved_tokens,
+        }
+
+
+prefix_cache = PrefixStateCache(PROMPT_CACHE_MAX_BYTES, PROMPT_CACHE_MAX_ENTRIES)
+
+
+def common_prefix_length(a, b):
+    n = 0
+    for x, y in zip(a, b):
+        if x != y:
+            break
+        n += 1
+    return n
+
+
+def tokenize(text):
+    # Same as Llama.create_completion() does for string prompts: special=True turns
+    # the literal <s> of the template into the BOS token
+    return model.tokenize(text.encode('utf-8'), special=True)
+
+
+def restore_prefix(prefix, prompt_tokens):
+    """Load (or build and cache) the model state for the system-prompt prefix.
+
+    Llama.generate() reuses any evaluated tokens that match the start of the
+    new prompt, so after this only the user portion gets evaluated.
+    Returns (cache_hit, reused_tokens).
+    """
+    state = prefix_cache.get(prefix)
+    if state is not None:
+        model.load_state(state)
+        reused = common_prefix_length(state.input_ids[:state.n_tokens].tolist(), prompt_tokens)
+        if reused < state.n_tokens:
+            app.logger.warning("Cached prefix matches only %d of its %d tokens", reused, state.n_tokens)
+        prefix_cache.saved_tokens += reused
+        return True, reused
+
+    reused = common_prefix_length(tokenize(prefix), prompt_tokens)
+    model.reset()
+    model.eval(prompt_tokens[:reused])
+    prefix_cache.put(prefix, model.save_state())
+    return False, 0
+
+
+def generation_options(data):
+    """Per-request max_tokens / stop overrides, validated against the server limits"""
+    max_tokens = data.get('max_tokens', DEFAULT_MAX_TOKENS)
+    if not isinstance(max_tokens, int) or isinstance(max_tokens, bool) or max_tokens <= 0:
+        raise ValueError("max_tokens must be a positive integer")
+    stop = data.get('stop') or []
+    if isinstance(stop, str):
+        stop = [stop]
+    if not isinstance(stop, list) or not all(isinstance(s, str) for s in stop):
+        raise ValueError("stop must be a string or a list of strings")
+    return {'max_tokens': min(max_tokens, MAX_TOKENS_LIMIT), 'stop': stop}
+
+
+def cache_info(cache_hit, saved_tokens, prompt_tokens):
+    return {'hit': cache_hit, 'saved_tokens': saved_tokens, 'evaluated_tokens': len(prompt_tokens) - saved_tokens}
+
+
+def stream_completion(prefix, prompt_tokens, options):
+    """Yield llama.cpp chunks as server-sent events.
+
+    The model lock is held until the generator is closed; when the client
+    disconnects the server closes it, which stops the llama.cpp generation.
+    """
+    with model_lock:
+        cache_hit, saved_tokens = restore_prefix(prefix, prompt_tokens)
+        chunks = model(prompt_tokens, stream=True, **options)
+        try:
+            for chunk in chunks:
+                yield f"data: {json.dumps(chunk)}\n\n"
+            yield f"data: {json.dumps({'prompt_cache': cache_info(cache_hit, saved_tokens, prompt_tokens)})}\n\n"
+            yield "data: [DONE]\n\n"
+        finally:
+            chunks.close()
+
+
+@app.route('/predict', methods=['POST'])
 def predict():
-    data = request.json 
-    prompt = f"""<s>[INST] <<SYS>>{data.get('sys_msg', '')}<</SYS>>{data.get('prompt', '')} [/INST]""" 
-    response = model(prompt, max_tokens=1000) 
-    return jsonify({'response': response}) 
+    data = request.json
+    try:
+        options = generation_options(data)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    prefix = f"""<s>[INST] <<SYS>>{data.get('sys_msg', '')}<</SYS>>"""
+    prompt = f"""{prefix}{data.get('prompt', '')} [/INST]"""
+    # Tokenized once; the cache and the completion must see the same tokens
+    prompt_tokens = tokenize(prompt)
+
+    if data.get('stream'):
+        return Response(stream_completion(prefix, prompt_tokens, options), mimetype='text/event-stream',
+                        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+    with model_lock:
+        cache_hit, saved_tokens = restore_prefix(prefix, prompt_tokens)
+        response = model(prompt_tokens, **options)
+    return jsonify({'response': response, 'prompt_cache': cache_info(cache_hit, saved_tokens, prompt_tokens)})
+
+@app.route('/cache/stats', methods=['GET'])
+def cache_stats():
+    with model_lock:
+        return jsonify(prefix_cache.stats())
 
-if __name__ == '__main__': 
-    app.run(host='0.0.0.0', port=5000) 
+if __name__ == '__main__':
+    app.run(host='0.0.0.0', port=int(os.getenv("PORT", 5000)))
@@ -0,0 +1,54 @@
+"""
+Check that the prompt-prefix cache skips the system prompt.
+
+Sends /predict requests with the same sys_msg through the Flask test client
+and counts the prompt tokens llama.cpp evaluates: once the prefix is cached,
+only the user part of the prompt may be evaluated.
+
+    $ MODEL_PATH=tinyllama-1.1b-chat.Q4_K_M.gguf python check_prompt_cache.py
+"""
+
+import sys
+
+import app as server
+
+SYS_MSG = ("You are a helpful, respectful and honest assistant. Always answer as helpfully as possible, "
+           "while being safe. If a question does not make any sense, explain why instead of answering.")
+PROMPTS = ["What is Kubernetes?", "What is a pod?", "How do I scale a deployment?"]
+
+# Llama.generate() evaluates the not-yet-evaluated part of the prompt in one eval() call
+evaluated = []
+model_eval = server.model.eval
+
+
+def counting_eval(tokens):
+    evaluated.append(len(tokens))
+    return model_eval(tokens)
+
+
+server.model.eval = counting_eval
+
+
+def main():
+    client = server.app.test_client()
+    prefix = f"""<s>[INST] <<SYS>>{SYS_MSG}<</SYS>>"""
+    failed = False
+    for i, prompt in enumerate(PROMPTS):
+        evaluated.clear()
+        response = client.post('/predict', json={'sys_msg': SYS_MSG, 'prompt': prompt, 'max_tokens': 1})
+        cache = response.get_json()['prompt_cache']
+
+        prompt_tokens = server.tokenize(f"{prefix}{prompt} [/INST]")
+        prefix_length = server.common_prefix_length(server.tokenize(prefix), prompt_tokens)
+        # On a miss the prefix is evaluated first (and cached), then the rest
+        prompt_evals = evaluated[:1] if i else evaluated[:2]
+        expected = [len(prompt_tokens) - prefix_length] if i else [prefix_length, len(prompt_tokens) - prefix_length]
+        ok = cache['hit'] == (i > 0) and cache['saved_tokens'] == (prefix_length if i else 0) and prompt_evals == expected
+        failed |= not ok
+        print(f"{'ok  ' if ok else 'FAIL'} request {i + 1}: prompt_cache={cache} evaluated={prompt_evals} "
+              f"expected={expected} (prefix {prefix_length} of {len(prompt_tokens)} tokens)")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
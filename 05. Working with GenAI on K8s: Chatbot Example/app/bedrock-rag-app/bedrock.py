@@ -2,9 +2,12 @@ import os
 import json
 import io
 import csv
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
 
 # FastAPI and Pydantic imports
-from fastapi import FastAPI, UploadFile, File, HTTPException
+from fastapi import FastAPI, UploadFile, File, HTTPException, Response
 from fastapi.responses import JSONResponse
 from pydantic import BaseModel
 from typing import Optional
@@ -18,12 +21,83 @@ import random
 import string
 from urllib.parse import urlparse
 
-# Setup logging configuration
-logging.basicConfig(level=logging.DEBUG)
+# OpenTelemetry tracing and Prometheus metrics
+from opentelemetry import trace
+from opentelemetry.sdk.resources import Resource
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import BatchSpanProcessor
+from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+from prometheus_client import Histogram, CONTENT_TYPE_LATEST, generate_latest
+
+# Setup logging configuration (DEBUG logs full payloads, keep it off the hot path)
+logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO"))
 logger = logging.getLogger(__name__)
+
+# Spans are exported when OTEL_EXPORTER_OTLP_ENDPOINT points at a collector
+tracer_provider = TracerProvider(resource=Resource.create({"service.name": os.getenv("OTEL_SERVICE_NAME", "bedrock-rag-app")}))
+if os.getenv("OTEL_EXPORTER_OTLP_ENDPOINT"):
+    tracer_provider.add_span_processor(BatchSpanProcessor(OTLPSpanExporter()))
+trace.set_tracer_provider(tracer_provider)
+tracer = trace.get_tracer(__name__)
+
+STAGE_LATENCY = Histogram("rag_stage_duration_seconds", "Time spent in each stage of a /generate request", ["stage"],
+                          buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2, 5, 10, 30))
+
+
+class RequestTimings:
+    """Stage timings of one request, recorded as spans, histograms and a Server-Timing header"""
+
+    def __init__(self, root_span):
+        self.root_context = trace.set_span_in_context(root_span)
+        self.durations = {}
+        self.open_stages = {}
+
+    def start(self, stage, key):
+        span = tracer.start_span(f"rag.{stage}", context=self.root_context)
+        self.open_stages[key] = (stage, span, time.perf_counter())
+
+    def end(self, key):
+        if key not in self.open_stages:
+            return
+        stage, span, start = self.open_stages.pop(key)
+        elapsed = time.perf_counter() - start
+        span.end()
+        STAGE_LATENCY.labels(stage=stage).observe(elapsed)
+        self.durations[stage] = self.durations.get(stage, 0.0) + elapsed
+
+    def server_timing(self, total):
+        entries = [f"{stage};dur={elapsed * 1000:.1f}" for stage, elapsed in self.durations.items()]
+        return ", ".join(entries + [f"total;dur={total * 1000:.1f}"])
+
+
+# Timings of the request being handled
+current_timings = ContextVar("current_timings", default=None)
+
+
+@contextmanager
+def stage(name):
+    """Time a block as a stage of the current request, no-op outside /generate"""
+    timings = current_timings.get()
+    if timings is None:
+        yield
+        return
+    key = object()
+    timings.start(name, key)
+    try:
+        yield
+    finally:
+        timings.end(key)
+
+
 # FastAPI app instance
 app = FastAPI()
 
+
+@app.get("/metrics")
+def metrics():
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
+
 # Read Qdrant endpoint from an environment variable
 QDRANT_ENDPOINT = os.getenv("QDRANT_ENDPOINT", "http://localhost:6333")  # Default to localhost if not set
 
@@ -71,89 +145,102 @@ async def create_collection(request: VectorDataModel):
 
 def generate_embedding(text):
     try:
-        response = bedrock.invoke_model(
-            modelId='amazon.titan-embed-text-v2:0',
-            contentType='application/json',
-            body=json.dumps({"inputText": text, "dimensions": 1024, "normalize": True})  # Pass the batch of texts
-        )
-        model_response = json.loads(response["body"].read())
+        with stage("embedding"):
+            response = bedrock.invoke_model(
+                modelId='amazon.titan-embed-text-v2:0',
+                contentType='application/json',
+                body=json.dumps({"inputText": text, "dimensions": 1024, "normalize": True})  # Pass the batch of texts
+            )
+            model_response = json.loads(response["body"].read())
 
-        embedding = model_response['embedding']
-        app.logger.debug(embedding)
-        return embedding
+        return model_response['embedding']
     except Exception as e:
-        app.logger.error(f"An error occurred while generating embeddings: {e}")
+        logger.error(f"An error occurred while generating embeddings: {e}")
         return None
 
 def perform_similarity_search(prompt, top_k=5):
     
     prompt_embedding = generate_embedding(prompt)
     
-    app.logger.info("Response from Prompt Embedding:")
-    app.logger.info(prompt_embedding)
-    
     # Perform similarity search in Qdrant
-    search_result = client.search(
-        collection_name=collection_name,
-        query_vector=prompt_embedding,
-        # top=top_k
-    )
-    app.logger.info("Response from Qdrant Search:")
-    app.logger.info(search_result)
+    with stage("qdrant_search"):
+        search_result = client.search(
+            collection_name=collection_name,
+            query_vector=prompt_embedding,
+            # top=top_k
+        )
+    logger.debug("Response from Qdrant Search:")
+    logger.debug(search_result)
     
     return search_result
     
 def generate_bedrock_response(prompt, context):
-    # Combine the prompt with the context retrieved from Qdrant
-    context_text = "\n".join(context)
-    combined_prompt = f"Context:\n{context_text}\n\nPrompt:\n{prompt}"
-    
-    app.logger.info("Bedrock Prompt:")
-    app.logger.info(combined_prompt)
-    
-    native_request = {
-        "anthropic_version": "bedrock-2023-05-31",
-        "max_tokens": 1024,
-        "temperature": 0.5,
-        "messages": [
-            {
-                "role": "user",
-                "content": [{"type": "text", "text": combined_prompt}],
-            }
-        ],
-    }
+    with stage("prompt_assembly"):
+        # Combine the prompt with the context retrieved from Qdrant
+        context_text = "\n".join(context)
+        combined_prompt = f"Context:\n{context_text}\n\nPrompt:\n{prompt}"
+
+        native_request = {
+            "anthropic_version": "bedrock-2023-05-31",
+            "max_tokens": 1024,
+            "temperature": 0.5,
+            "messages": [
+                {
+                    "role": "user",
+                    "content": [{"type": "text", "text": combined_prompt}],
+                }
+            ],
+        }
+        body = json.dumps(native_request)
+
+    logger.debug("Bedrock Prompt:")
+    logger.debug(combined_prompt)
     
     # Call the Bedrock API
-    response = bedrock.invoke_model(
-            modelId='anthropic.claude-3-haiku-20240307-v1:0',
-            body=json.dumps(native_request)  # Pass the batch of texts
-        )
-    
-    model_response = json.loads(response["body"].read())
+    with stage("llm"):
+        response = bedrock.invoke_model(
+                modelId='anthropic.claude-3-haiku-20240307-v1:0',
+                body=body  # Pass the batch of texts
+            )
+
+        model_response = json.loads(response["body"].read())
     
-    app.logger.info(model_response)
+    logger.debug(model_response)
     
     return model_response["content"][0]["text"]
     
 
 @app.post("/generate")
 async def generate_answer(prompt_model: PromptModel):
+    request_start = time.perf_counter()
+    with tracer.start_as_current_span("rag.generate") as root_span:
+        timings = RequestTimings(root_span)
+        token = current_timings.set(timings)
+        try:
+            return answer_prompt(prompt_model, timings, request_start)
+        finally:
+            current_timings.reset(token)
+
+
+def answer_prompt(prompt_model, timings, request_start):
     try:
         prompt = prompt_model.prompt
 
         if not prompt:
             raise HTTPException(status_code=400, detail="Prompt is required")
     
-        logger.info(prompt)
+        logger.debug(prompt)
         
         search_results = perform_similarity_search(prompt)
     
-        context = [json.dumps(hit.payload) for hit in search_results if hit.payload]
+        with stage("prompt_assembly"):
+            context = [json.dumps(hit.payload) for hit in search_results if hit.payload]
         
         # Generate a response from Bedrock based on the context and user prompt
         response = generate_bedrock_response(prompt, context)
         
-        return JSONResponse({"response": response}, status_code=200)
+        return JSONResponse({"response": response}, status_code=200,
+                            headers={"Server-Timing": timings.server_timing(time.perf_counter() - request_start)})
         
     except httpx.HTTPStatusError as e:
         logger.error("HTTP Error occurred while downloading the file: %s", e)
@@ -202,7 +289,7 @@ async def load_data(request: VectorDataModel):
     
         # Insert the batch into Qdrant
         client.upsert(collection_name=collection_name, points=points)
-        app.logger.info(f"Batch inserted, total points: {len(points)}")
+        logger.info(f"Batch inserted, total points: {len(points)}")
         
         return JSONResponse({"message": "Document ingested successfully!"}, status_code=200)
 
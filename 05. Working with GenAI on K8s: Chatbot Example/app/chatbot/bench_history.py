@@ -0,0 +1,73 @@
+"""
+Benchmark of chat history cost for long sessions.
+
+Simulates many concurrent browser sessions, each sending a long series of
+turns through chat_with_model against a stub backend (see loadtest.py), and
+renders every reply the way Gradio does (Chatbot.postprocess + JSON). Reports
+per-turn render latency, payload size and peak resident memory.
+
+Run once per setting to compare, since peak RSS is per process:
+
+    python bench_history.py --sessions 300 --turns 200 --max-turns 20
+    python bench_history.py --sessions 300 --turns 200 --max-turns 0   # uncapped
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import resource
+import statistics
+import time
+
+from loadtest import StubBackend, load_app, percentile
+
+
+async def main(args):
+    backend = StubBackend(args.latency, 0.0)
+    port = await backend.start()
+    os.environ["RAG_API_ENDPOINT"] = f"http://127.0.0.1:{port}/generate"
+    os.environ["FINETUNE_API_ENDPOINT"] = f"http://127.0.0.1:{port}/generate"
+    os.environ["CHAT_HISTORY_MAX_TURNS"] = str(args.max_turns)
+    os.environ["API_MAX_CONCURRENCY"] = str(args.sessions)
+    app = load_app()
+    chatbot = app.gr.Chatbot()
+    answer = "lorem ipsum " * (args.reply_chars // 12)
+
+    render_times, payload_sizes = [], []
+
+    async def session(n):
+        history, session_id = None, None
+        for turn in range(args.turns):
+            messages, history, session_id = await app.chat_with_model(f"{answer} {n}/{turn}", "Shopping", history, session_id)
+            start = time.perf_counter()
+            payload = json.dumps(chatbot.postprocess(messages).model_dump())
+            render_times.append(time.perf_counter() - start)
+            payload_sizes.append(len(payload))
+
+    start = time.perf_counter()
+    await asyncio.gather(*(session(n) for n in range(args.sessions)))
+    elapsed = time.perf_counter() - start
+    await app.http_client.aclose()
+
+    print(json.dumps({
+        "sessions": args.sessions,
+        "turns_per_session": args.turns,
+        "max_turns": args.max_turns,
+        "elapsed_s": round(elapsed, 2),
+        "render_p50_ms": round(statistics.median(render_times) * 1000, 3),
+        "render_p99_ms": round(percentile(render_times, 0.99) * 1000, 3),
+        "payload_last_turn_kb": round(payload_sizes[-1] / 1024, 1),
+        "payload_max_kb": round(max(payload_sizes) / 1024, 1),
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=300)
+    parser.add_argument("--turns", type=int, default=200)
+    parser.add_argument("--max-turns", type=int, default=20, help="CHAT_HISTORY_MAX_TURNS, 0 for uncapped")
+    parser.add_argument("--reply-chars", type=int, default=600, help="approximate size of each prompt/reply")
+    parser.add_argument("--latency", type=float, default=0.0, help="injected backend latency in seconds")
+    asyncio.run(main(parser.parse_args()))
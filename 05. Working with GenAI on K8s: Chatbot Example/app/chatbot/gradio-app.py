@@ -1,6 +1,8 @@
 import gradio as gr
 import os
-import requests
+import asyncio
+import httpx
+from collections import deque
 import logging
 import sys
 
@@ -8,50 +10,125 @@ import sys
 API_1_ENDPOINT = os.getenv("RAG_API_ENDPOINT", "http://localhost:5000/generate")
 API_2_ENDPOINT = os.getenv("FINETUNE_API_ENDPOINT", "http://localhost:5000/generate")
 
+# HTTP client settings (seconds / counts)
+API_CONNECT_TIMEOUT = float(os.getenv("API_CONNECT_TIMEOUT", 5))
+API_READ_TIMEOUT = float(os.getenv("API_READ_TIMEOUT", 120))
+API_MAX_RETRIES = int(os.getenv("API_MAX_RETRIES", 2))
+API_MAX_CONCURRENCY = int(os.getenv("API_MAX_CONCURRENCY", 16))
+RAG_API_MAX_CONCURRENCY = int(os.getenv("RAG_API_MAX_CONCURRENCY", API_MAX_CONCURRENCY))
+FINETUNE_API_MAX_CONCURRENCY = int(os.getenv("FINETUNE_API_MAX_CONCURRENCY", API_MAX_CONCURRENCY))
+
+# Chat history limits per browser session
+CHAT_HISTORY_MAX_TURNS = int(os.getenv("CHAT_HISTORY_MAX_TURNS", 20))  # 0 keeps every turn
+CHAT_MAX_MESSAGE_CHARS = int(os.getenv("CHAT_MAX_MESSAGE_CHARS", 4000))  # 0 disables trimming
+CHAT_SESSION_TTL = int(os.getenv("CHAT_SESSION_TTL", 3600))  # Seconds before an idle session's state is freed
+
+# Gateway errors that are worth retrying (backend pod restarting or overloaded)
+RETRY_STATUS_CODES = {502, 503, 504}
+
 # Set up logging
 logging.basicConfig(level=logging.DEBUG, handlers=[logging.StreamHandler(sys.stdout)])
 logger = logging.getLogger()
 
+# One pooled keep-alive client shared by all sessions
+http_client = httpx.AsyncClient(
+    headers={"Content-Type": "application/json"},
+    timeout=httpx.Timeout(API_READ_TIMEOUT, connect=API_CONNECT_TIMEOUT),
+    limits=httpx.Limits(
+        max_connections=RAG_API_MAX_CONCURRENCY + FINETUNE_API_MAX_CONCURRENCY,
+        max_keepalive_connections=RAG_API_MAX_CONCURRENCY + FINETUNE_API_MAX_CONCURRENCY,
+    ),
+)
+
+# Model choice -> (endpoint, limit on in-flight requests to that backend)
+backends = {
+    "Shopping": (API_1_ENDPOINT, asyncio.Semaphore(RAG_API_MAX_CONCURRENCY)),
+    "Loyalty Program": (API_2_ENDPOINT, asyncio.Semaphore(FINETUNE_API_MAX_CONCURRENCY)),
+}
+
+
+async def post_with_retries(api_endpoint, data, limit):
+    """POST to a backend, retrying connection failures and gateway errors with backoff"""
+    async with limit:
+        for attempt in range(API_MAX_RETRIES + 1):
+            try:
+                response = await http_client.post(api_endpoint, json=data)
+                if response.status_code not in RETRY_STATUS_CODES or attempt == API_MAX_RETRIES:
+                    response.raise_for_status()  # Check for HTTP request errors
+                    return response.json()
+                logger.warning(f"Backend returned {response.status_code}, retrying ({attempt + 1}/{API_MAX_RETRIES})")
+            except (httpx.ConnectError, httpx.ConnectTimeout) as e:
+                if attempt == API_MAX_RETRIES:
+                    raise
+                logger.warning(f"Connection to backend failed: {e}, retrying ({attempt + 1}/{API_MAX_RETRIES})")
+            await asyncio.sleep(0.5 * 2 ** attempt)
+
+
+class ChatHistory:
+    """Per-session chat turns, capped so long sessions stay cheap to keep and render"""
+
+    def __init__(self, max_turns=CHAT_HISTORY_MAX_TURNS, max_chars=CHAT_MAX_MESSAGE_CHARS):
+        self.turns = deque(maxlen=max_turns or None)
+        self.max_chars = max_chars
+        self.dropped = 0
+
+    def trim(self, text):
+        text = str(text)
+        if self.max_chars and len(text) > self.max_chars:
+            return text[:self.max_chars] + " …"
+        return text
+
+    def append(self, user_input, model_response):
+        if self.turns.maxlen and len(self.turns) == self.turns.maxlen:
+            self.dropped += 1  # The oldest turn falls off the deque
+        self.turns.append((self.trim(user_input), self.trim(model_response)))
+
+    def to_chatbot(self, pending=None):
+        """Messages for gr.Chatbot, with a note in place of the dropped turns"""
+        messages = []
+        if self.dropped:
+            messages.append({"role": "assistant", "content": f"({self.dropped} earlier turns hidden)"})
+        for user_input, model_response in list(self.turns) + ([pending] if pending else []):
+            messages.append({"role": "user", "content": user_input})
+            messages.append({"role": "assistant", "content": model_response})
+        return messages
+
+
 # Function to send the prompt to the model and get the response
-def chat_with_model(user_input, model_choice, history=None, session_id=None):
-    
+async def chat_with_model(user_input, model_choice, history=None, session_id=None):
+
     if history is None:
-        history = []  # Initialize history as an empty list if it's None
+        history = ChatHistory()  # Start a new bounded history for this session
 
-    headers = {"Content-Type": "application/json"}
     data = {"prompt": user_input}
-    
+
     # Include session_id in the request if available
     if session_id:
         data["session_id"] = session_id
-        
-    if model_choice == "Shopping":
-        api_endpoint = API_1_ENDPOINT
-    elif model_choice == "Loyalty Program":
-        api_endpoint = API_2_ENDPOINT
-    else:
-        return history, "Error: Invalid model choice.", session_id
+
+    if model_choice not in backends:
+        return history.to_chatbot((user_input, "Error: Invalid model choice.")), history, session_id
+
+    api_endpoint, limit = backends[model_choice]
 
     try:
-        response = requests.post(api_endpoint, headers=headers, json=data)
-        response.raise_for_status()  # Check for HTTP request errors
-        response_data = response.json()
-        
+        response_data = await post_with_retries(api_endpoint, data, limit)
+
         logger.info(f"API Response: {response_data}")
-        
+
         model_response = response_data.get("response", "No response from model.")
         session_id = response_data.get("session_id", session_id)  # Capture or update the session_id
-        
-        history.append((user_input, model_response))
-        return history, history, session_id  # Return session_id to the UI
-    except requests.exceptions.RequestException as e:
+
+        history.append(user_input, model_response)
+        return history.to_chatbot(), history, session_id  # Return session_id to the UI
+    except (httpx.HTTPError, ValueError) as e:  # ValueError: the backend did not return JSON
         logging.error(f"Error occurred: {e}")
-        return history, f"Error: {e}", session_id
-        
-        
+        return history.to_chatbot((user_input, f"Error: {e}")), history, session_id
+
+
 def clear_chat():
-    return [], "", None  # Return empty history, input, and session_id
-    
+    return [], "", None, None  # Return empty chat, input, history and session_id
+
 
 # Create a Gradio Chat Interface
 with gr.Blocks() as demo:
@@ -59,22 +136,24 @@ with gr.Blocks() as demo:
     # chatbot = gr.Chatbot(height=600)
     chatbot = gr.Chatbot()
     model_choice = gr.Radio(choices=["Shopping", "Loyalty Program"], label="Choose an assistant")
-    
+
     user_input = gr.Textbox(show_label=False, label="Type your question")
     clear_btn = gr.Button("Clear")
 
-    state = gr.State()
+    state = gr.State(time_to_live=CHAT_SESSION_TTL)  # Holds the session's ChatHistory
     session_id = gr.State()  # Store the session_id in Gradio's State component
-    
+
     submit_button = gr.Button("Submit")
-    
+
     submit_button.click(
-        chat_with_model, 
+        chat_with_model,
         inputs=[user_input, model_choice, state, session_id],  # Pass session_id in the input
-        outputs=[chatbot, chatbot, session_id]  # Update session_id in the state
+        outputs=[chatbot, state, session_id],  # Update history and session_id in the state
+        concurrency_limit=None  # Backend semaphores bound the in-flight requests instead
     )
-    
-    clear_btn.click(clear_chat, None, [chatbot, user_input, session_id])
+
+    clear_btn.click(clear_chat, None, [chatbot, user_input, state, session_id])
 
 
-demo.launch(server_name="0.0.0.0", server_port=7860)
+if __name__ == "__main__":
+    demo.launch(server_name="0.0.0.0", server_port=7860)
@@ -0,0 +1,118 @@
+"""
+Load test for the chatbot UI backend.
+
+Starts stub RAG / fine-tuned backends on localhost that answer /generate after an
+injected latency, points gradio-app.py at them and fires concurrent chat
+requests through chat_with_model. Reports throughput, latency percentiles,
+errors and how many TCP connections the backends had to accept.
+
+    python loadtest.py --requests 500 --concurrency 100 --latency 0.5
+"""
+
+import argparse
+import asyncio
+import importlib.util
+import json
+import os
+import random
+import statistics
+import time
+
+
+class StubBackend:
+    """Minimal HTTP/1.1 keep-alive server returning a canned /generate response"""
+
+    def __init__(self, latency, error_rate):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.connections = 0
+        self.requests = 0
+        self.server = None
+
+    async def start(self):
+        self.server = await asyncio.start_server(self.handle, "127.0.0.1", 0)
+        return self.server.sockets[0].getsockname()[1]
+
+    async def handle(self, reader, writer):
+        self.connections += 1
+        try:
+            while True:
+                headers = await reader.readuntil(b"\r\n\r\n")
+                length = 0
+                for line in headers.split(b"\r\n"):
+                    if line.lower().startswith(b"content-length:"):
+                        length = int(line.split(b":", 1)[1])
+                body = json.loads(await reader.readexactly(length) or b"{}")
+                self.requests += 1
+                await asyncio.sleep(self.latency)
+                if random.random() < self.error_rate:
+                    status, payload = "503 Service Unavailable", b"{}"
+                else:
+                    status = "200 OK"
+                    payload = json.dumps({"response": f"echo: {body.get('prompt', '')}",
+                                          "session_id": body.get("session_id") or "stub"}).encode()
+                writer.write(f"HTTP/1.1 {status}\r\nContent-Type: application/json\r\n"
+                             f"Content-Length: {len(payload)}\r\n\r\n".encode() + payload)
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionResetError):
+            pass
+        finally:
+            writer.close()
+
+
+def load_app():
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "gradio-app.py")
+    spec = importlib.util.spec_from_file_location("gradio_app", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+async def main(args):
+    rag, finetune = StubBackend(args.latency, args.error_rate), StubBackend(args.latency, args.error_rate)
+    os.environ["RAG_API_ENDPOINT"] = f"http://127.0.0.1:{await rag.start()}/generate"
+    os.environ["FINETUNE_API_ENDPOINT"] = f"http://127.0.0.1:{await finetune.start()}/generate"
+    app = load_app()
+
+    latencies, errors = [], 0
+    gate = asyncio.Semaphore(args.concurrency)
+
+    async def one(i):
+        nonlocal errors
+        async with gate:
+            start = time.perf_counter()
+            messages, _, _ = await app.chat_with_model(f"question {i}", random.choice(list(app.backends)))
+            latencies.append(time.perf_counter() - start)
+            if messages[-1]["content"].startswith("Error:"):
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(args.requests)))
+    elapsed = time.perf_counter() - start
+    await app.http_client.aclose()
+
+    print(json.dumps({
+        "requests": args.requests,
+        "concurrency": args.concurrency,
+        "injected_latency_s": args.latency,
+        "throughput_rps": round(args.requests / elapsed, 2),
+        "p50_ms": round(statistics.median(latencies) * 1000, 1),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 1),
+        "errors": errors,
+        "backend_requests": rag.requests + finetune.requests,
+        "backend_connections": rag.connections + finetune.connections,
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--latency", type=float, default=0.5, help="injected backend latency in seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of backend replies that are 503")
+    asyncio.run(main(parser.parse_args()))
@@ -4,14 +4,17 @@ import os
 import io
 import csv
 import logging
+import time
 import traceback
+from contextlib import contextmanager
+from contextvars import ContextVar
 
 # Third-party libraries
 import httpx
 import boto3
 
 # FastAPI and Pydantic imports
-from fastapi import FastAPI, UploadFile, File, HTTPException
+from fastapi import FastAPI, UploadFile, File, HTTPException, Response
 from fastapi.responses import JSONResponse
 from pydantic import BaseModel
 from typing import Optional
@@ -38,6 +41,7 @@ from langchain_core.runnables import RunnablePassthrough
 from langchain_core.output_parsers import StrOutputParser
 from langchain_core.runnables.history import RunnableWithMessageHistory
 from langchain_core.chat_history import BaseChatMessageHistory
+from langchain_core.callbacks import BaseCallbackHandler
 
 # OpenAI Integrations
 from langchain_openai import ChatOpenAI, OpenAIEmbeddings
@@ -45,10 +49,121 @@ from langchain_openai import ChatOpenAI, OpenAIEmbeddings
 # Langsmith Tracing
 from langsmith import traceable
 
-# Setup logging configuration
-logging.basicConfig(level=logging.DEBUG)
+# OpenTelemetry tracing and Prometheus metrics
+from opentelemetry import trace
+from opentelemetry.sdk.resources import Resource
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import BatchSpanProcessor
+from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+from prometheus_client import Histogram, CONTENT_TYPE_LATEST, generate_latest
+
+# Setup logging configuration (DEBUG logs full payloads, keep it off the hot path)
+logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO"))
 logger = logging.getLogger(__name__)
 
+# Spans are exported when OTEL_EXPORTER_OTLP_ENDPOINT points at a collector
+tracer_provider = TracerProvider(resource=Resource.create({"service.name": os.getenv("OTEL_SERVICE_NAME", "rag-app")}))
+if os.getenv("OTEL_EXPORTER_OTLP_ENDPOINT"):
+    tracer_provider.add_span_processor(BatchSpanProcessor(OTLPSpanExporter()))
+trace.set_tracer_provider(tracer_provider)
+tracer = trace.get_tracer(__name__)
+
+STAGE_LATENCY = Histogram("rag_stage_duration_seconds", "Time spent in each stage of a /generate request", ["stage"],
+                          buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2, 5, 10, 30))
+
+
+class RequestTimings:
+    """Stage timings of one request, recorded as spans, histograms and a Server-Timing header"""
+
+    def __init__(self, root_span):
+        self.root_context = trace.set_span_in_context(root_span)
+        self.durations = {}
+        self.open_stages = {}
+
+    def start(self, stage, key):
+        span = tracer.start_span(f"rag.{stage}", context=self.root_context)
+        self.open_stages[key] = (stage, span, time.perf_counter())
+
+    def end(self, key):
+        if key not in self.open_stages:
+            return
+        stage, span, start = self.open_stages.pop(key)
+        elapsed = time.perf_counter() - start
+        span.end()
+        STAGE_LATENCY.labels(stage=stage).observe(elapsed)
+        self.durations[stage] = self.durations.get(stage, 0.0) + elapsed
+
+    def server_timing(self, total):
+        entries = [f"{stage};dur={elapsed * 1000:.1f}" for stage, elapsed in self.durations.items()]
+        return ", ".join(entries + [f"total;dur={total * 1000:.1f}"])
+
+
+# Timings of the request being handled (copied into LangChain's worker threads)
+current_timings = ContextVar("current_timings", default=None)
+
+
+@contextmanager
+def stage(name):
+    """Time a block as a stage of the current request, no-op outside /generate"""
+    timings = current_timings.get()
+    if timings is None:
+        yield
+        return
+    key = object()
+    timings.start(name, key)
+    try:
+        yield
+    finally:
+        timings.end(key)
+
+
+class StageCallbackHandler(BaseCallbackHandler):
+    """Times the question rewriting, prompt assembly and answer LLM call of the RAG chain"""
+
+    def __init__(self, timings):
+        self.timings = timings
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, tags=None, **kwargs):
+        self.timings.start("rewrite" if tags and "rewrite" in tags else "llm", run_id)
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        self.timings.end(run_id)
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        self.timings.end(run_id)
+
+    def on_chain_start(self, serialized, inputs, *, run_id, **kwargs):
+        # The stuff-documents chain formats the retrieved documents in "format_inputs"
+        if kwargs.get("name") == "format_inputs":
+            self.timings.start("prompt_assembly", run_id)
+
+    def on_chain_end(self, outputs, *, run_id, **kwargs):
+        self.timings.end(run_id)
+
+    def on_chain_error(self, error, *, run_id, **kwargs):
+        self.timings.end(run_id)
+
+
+class TimedOpenAIEmbeddings(OpenAIEmbeddings):
+    """OpenAI embeddings that time query embedding as the "embedding" stage"""
+
+    def embed_query(self, text):
+        with stage("embedding"):
+            return super().embed_query(text)
+
+
+class TimedQdrantClient(QdrantClient):
+    """Qdrant client that times searches as the "qdrant_search" stage"""
+
+    def query_points(self, *args, **kwargs):
+        with stage("qdrant_search"):
+            return super().query_points(*args, **kwargs)
+
+    def search(self, *args, **kwargs):
+        with stage("qdrant_search"):
+            return super().search(*args, **kwargs)
+
+
 # Hold user sessions (Consider using Redis or a persistent store for scalability)
 user_sessions = {}
 
@@ -57,7 +172,7 @@ QDRANT_ENDPOINT = os.getenv("QDRANT_ENDPOINT", "http://localhost:6333")
 
 try:
     # Set up Qdrant client with proper error handling
-    qdrant_client = QdrantClient(url=QDRANT_ENDPOINT)
+    qdrant_client = TimedQdrantClient(QDRANT_ENDPOINT)  # A URL, or ":memory:" for a local in-process instance
     collection_name = "catalog"
     logger.info("Successfully connected to Qdrant at %s", QDRANT_ENDPOINT)
 except Exception as e:
@@ -75,6 +190,11 @@ class LoadDataModel(BaseModel):
 # FastAPI app instance
 app = FastAPI()
 
+
+@app.get("/metrics")
+def metrics():
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
 @app.post("/load_data")
 async def load_data(request: LoadDataModel):
     try:
@@ -137,6 +257,17 @@ def get_session_history(session_id: str) -> BaseChatMessageHistory:
 @app.post("/generate")
 @traceable()
 async def generate_answer(prompt_model: PromptModel):
+    request_start = time.perf_counter()
+    with tracer.start_as_current_span("rag.generate") as root_span:
+        timings = RequestTimings(root_span)
+        token = current_timings.set(timings)
+        try:
+            return run_rag_chain(prompt_model, timings, request_start)
+        finally:
+            current_timings.reset(token)
+
+
+def run_rag_chain(prompt_model, timings, request_start):
     try:
         prompt = prompt_model.prompt
         session_id = prompt_model.session_id
@@ -165,7 +296,7 @@ async def generate_answer(prompt_model: PromptModel):
             ]
         )
         llm = ChatOpenAI(model="gpt-3.5-turbo", temperature=0)
-        embeddings = OpenAIEmbeddings()
+        embeddings = TimedOpenAIEmbeddings()
         
         qdrant_store = QdrantVectorStore(
             embedding=embeddings, 
@@ -174,7 +305,7 @@ async def generate_answer(prompt_model: PromptModel):
         )
         
         history_aware_retriever = create_history_aware_retriever(
-            llm, qdrant_store.as_retriever(), contextualize_q_prompt
+            llm.with_config(tags=["rewrite"]), qdrant_store.as_retriever(), contextualize_q_prompt
         )
         
         ### Answer question ###
@@ -208,13 +339,13 @@ async def generate_answer(prompt_model: PromptModel):
         
         result = conversational_rag_chain.invoke(
             {"input": prompt},
-            config={"configurable": {"session_id": session_id}},
+            config={"configurable": {"session_id": session_id}, "callbacks": [StageCallbackHandler(timings)]},
         )["answer"]
 
-        
-        print (result)
+        logger.debug(result)
 
-        return JSONResponse({"response": result, "session_id": session_id}, status_code=200)
+        return JSONResponse({"response": result, "session_id": session_id}, status_code=200,
+                            headers={"Server-Timing": timings.server_timing(time.perf_counter() - request_start)})
     except Exception as e:
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=str(e))
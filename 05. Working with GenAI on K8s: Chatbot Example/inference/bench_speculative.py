@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Speculative decoding benchmark
+
+Builds a tiny random target model (with a LoRA adapter, like model-assets/)
+and a draft model sharing its tokenizer, loads main.py with DRAFT_MODEL_ID
+set, and generates each prompt greedily with and without the draft model.
+Reports whether the outputs are identical, the speedup and the acceptance rate.
+
+The draft is the target truncated to its first --draft-layers layers. The
+target's remaining layers have their output projections scaled down
+(--refine-scale) so they refine rather than overturn the draft's predictions,
+as with a distilled or smaller sibling model; with unscaled random weights the
+two models would agree on next to no tokens.
+
+Usage:
+    python bench_speculative.py
+    python bench_speculative.py --layers 12 --draft-layers 2 --new-tokens 128
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+# The shared tiny-model generator lives in the repository's bench/ directory
+BENCH_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'bench')
+PROMPTS = [
+    "What is the loyalty program?",
+    "How many points do I earn for every dollar spent?",
+    "Can I transfer my points to another member of my family?",
+    "When do my reward points expire and how can I extend them?",
+]
+
+
+def make_models(out, hidden_size, layers, draft_layers, refine_scale):
+    """Save target, LoRA adapter and draft models sharing one tokenizer; return their paths"""
+    import torch
+    from peft import LoraConfig, get_peft_model
+    from transformers import LlamaConfig, LlamaForCausalLM
+
+    sys.path.insert(0, BENCH_DIR)
+    from stubs import tiny_llama
+
+    target, tokenizer = tiny_llama(hidden_size, layers)
+    with torch.no_grad():
+        for layer in target.model.layers[draft_layers:]:
+            layer.self_attn.o_proj.weight.mul_(refine_scale)
+            layer.mlp.down_proj.weight.mul_(refine_scale)
+    paths = {name: os.path.join(out, name) for name in ('target', 'adapter', 'draft')}
+    target.save_pretrained(paths['target'])
+    tokenizer.save_pretrained(paths['target'])
+
+    draft = LlamaForCausalLM(LlamaConfig(**{**target.config.to_dict(), 'num_hidden_layers': draft_layers}))
+    draft.load_state_dict(target.state_dict(), strict=False)
+    draft.save_pretrained(paths['draft'])
+    tokenizer.save_pretrained(paths['draft'])
+
+    adapter = get_peft_model(target, LoraConfig(r=8, target_modules=["q_proj", "v_proj"], task_type="CAUSAL_LM"))
+    adapter.save_pretrained(paths['adapter'])
+    tokenizer.save_pretrained(paths['adapter'])
+    return paths
+
+
+def timed_generate(main, inputs, repeat, **kwargs):
+    """Return (output token ids, median seconds, target forward passes, draft forward passes)"""
+    samples = []
+    for _ in range(repeat):
+        target_before, draft_before = main.target_passes.count, main.draft_passes.count
+        start = time.perf_counter()
+        outputs = main.generate_sync(inputs, **kwargs)
+        samples.append(time.perf_counter() - start)
+    return (outputs[0].tolist(), statistics.median(samples),
+            main.target_passes.count - target_before, main.draft_passes.count - draft_before)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark speculative decoding in main.py")
+    parser.add_argument('--hidden-size', type=int, default=1024)
+    parser.add_argument('--layers', type=int, default=24, help="target model layers")
+    parser.add_argument('--draft-layers', type=int, default=1, help="draft model layers")
+    parser.add_argument('--refine-scale', type=float, default=0.02, help="output scale of the target-only layers")
+    parser.add_argument('--new-tokens', type=int, default=64)
+    parser.add_argument('--num-assistant-tokens', type=int, default=5)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        paths = make_models(tmpdir, args.hidden_size, args.layers, args.draft_layers, args.refine_scale)
+        os.environ.update(BASE_MODEL_ID=paths['target'], MODEL_ASSETS=paths['adapter'], DRAFT_MODEL_ID=paths['draft'],
+                          NUM_ASSISTANT_TOKENS=str(args.num_assistant_tokens), LOAD_IN_4BIT='0')
+        sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+        import main as server
+
+        # Random models have near-uniform next-token distributions, which would make the draft
+        # stop proposing at the default confidence threshold after every token
+        server.draft_model.generation_config.assistant_confidence_threshold = 0.0
+
+        # Same decoding settings as the /generate endpoint, with a fixed output length
+        kwargs = {'max_new_tokens': args.new_tokens, 'min_new_tokens': args.new_tokens, 'repetition_penalty': 1.15,
+                  'do_sample': False, 'pad_token_id': server.tokenizer.pad_token_id}
+        warmup = server.tokenizer(PROMPTS[0], return_tensors='pt').to(server.device)
+        server.generate_sync(warmup, assistant_model=None, **kwargs)
+        server.generate_sync(warmup, **kwargs)
+
+        speedups, accepted_total, proposed_total = [], 0, 0
+        for prompt in PROMPTS:
+            inputs = server.tokenizer(prompt, return_tensors='pt').to(server.device)
+            plain, plain_s, _, _ = timed_generate(server, inputs, args.repeat, assistant_model=None, **kwargs)
+            assisted, assisted_s, target_forwards, proposed = timed_generate(server, inputs, args.repeat, **kwargs)
+            generated = len(assisted) - inputs['input_ids'].shape[1]
+            accepted = max(0, generated - target_forwards)
+            accepted_total += accepted
+            proposed_total += proposed
+            speedups.append(plain_s / assisted_s)
+            print(json.dumps({
+                'prompt': prompt,
+                'identical': plain == assisted,
+                'plain_s': round(plain_s, 3),
+                'assisted_s': round(assisted_s, 3),
+                'speedup': round(plain_s / assisted_s, 2),
+                'target_forwards': target_forwards,
+                'draft_tokens': proposed,
+                'acceptance_rate': round(accepted / proposed, 3) if proposed else None,
+            }), flush=True)
+
+        print(json.dumps({
+            'layers': args.layers,
+            'draft_layers': args.draft_layers,
+            'refine_scale': args.refine_scale,
+            'new_tokens': args.new_tokens,
+            'median_speedup': round(statistics.median(speedups), 2),
+            'acceptance_rate': round(accepted_total / proposed_total, 3) if proposed_total else None,
+        }))
+
+
+if __name__ == '__main__':
+    main()
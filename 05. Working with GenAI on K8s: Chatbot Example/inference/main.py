@@ -1,75 +1,294 @@
 import torch
-from fastapi import FastAPI, Request
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request, Response
 from fastapi.responses import JSONResponse
 from transformers import LlamaTokenizerFast, LlamaForCausalLM, BitsAndBytesConfig, AutoTokenizer, AutoModelForCausalLM
+from transformers.generation.streamers import BaseStreamer
 from peft import PeftModel
+from prometheus_client import Counter, Gauge, Histogram, CONTENT_TYPE_LATEST, generate_latest
 import logging
 import json
+import os
 
-app = FastAPI()
+
+@asynccontextmanager
+async def lifespan(app):
+    # Warm up in the background so /live answers while the first generations run
+    warmup_task = asyncio.create_task(warm_up())
+    yield
+    warmup_task.cancel()
+
+
+app = FastAPI(lifespan=lifespan)
 
 logging.basicConfig(level=logging.INFO)
 app.logger = logging.getLogger("uvicorn")
 
+# Prometheus metrics, exposed on /metrics
+TOKEN_BUCKETS = (1, 8, 16, 32, 64, 128, 256, 512, 1024, 2048, 4096)
+REQUESTS = Counter("llm_requests_total", "Generation requests by HTTP status", ["status"])
+TIME_TO_FIRST_TOKEN = Histogram("llm_time_to_first_token_seconds", "Time from request arrival to the first generated token",
+                                buckets=(0.05, 0.1, 0.25, 0.5, 1, 2, 5, 10, 30, 60))
+REQUEST_LATENCY = Histogram("llm_request_duration_seconds", "Time from request arrival to the complete response",
+                            buckets=(0.1, 0.25, 0.5, 1, 2, 5, 10, 20, 30, 60, 120))
+PROMPT_TOKENS = Histogram("llm_prompt_tokens", "Prompt tokens per request", buckets=TOKEN_BUCKETS)
+GENERATED_TOKENS = Histogram("llm_generated_tokens", "Generated tokens per request", buckets=TOKEN_BUCKETS)
+TOKENS_PER_SECOND = Histogram("llm_generation_tokens_per_second", "Generated tokens per second of generate() time",
+                              buckets=(1, 2, 5, 10, 20, 50, 100, 200, 500, 1000))
+BATCH_SIZE = Histogram("llm_batch_size", "Sequences per generate() call", buckets=(1, 2, 4, 8, 16, 32, 64))
+IN_FLIGHT = Gauge("llm_requests_in_flight", "Requests being handled, queued or generating")
+QUEUE_DEPTH = Gauge("llm_queue_depth", "Requests waiting for the model")
+WARMUP_DURATION = Gauge("llm_warmup_duration_seconds", "Time spent on warm-up generations at startup")
+READY = Gauge("llm_ready", "1 once warm-up has finished and /ready reports the server ready")
+DRAFT_TOKENS = Counter("llm_speculative_draft_tokens_total", "Tokens proposed by the draft model")
+ACCEPTED_TOKENS = Counter("llm_speculative_accepted_tokens_total", "Draft tokens accepted by the target model")
+ACCEPTANCE_RATE = Histogram("llm_speculative_acceptance_rate", "Fraction of draft tokens accepted per request",
+                            buckets=(0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9, 1.0))
+
 app.logger.info(torch.cuda.is_available())  # Should return True
 device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
 
+# Model locations (overridable, e.g. to point the benchmarks at a tiny local model)
+model_assets = os.getenv("MODEL_ASSETS", "./model-assets")
+base_model_id = os.getenv("BASE_MODEL_ID", "meta-llama/Meta-Llama-3-8B")
+
 # Load tokenizer and model
-tokenizer = AutoTokenizer.from_pretrained('./model-assets')
+tokenizer = AutoTokenizer.from_pretrained(model_assets)
 
-# Define the quantization configuration for 8-bit
-base_model_id = "meta-llama/Meta-Llama-3-8B"
+# Define the quantization configuration for 8-bit (bitsandbytes 4-bit needs a GPU, LOAD_IN_4BIT=0 disables it)
 bnb_config = BitsAndBytesConfig(
     load_in_4bit=True,
     bnb_4bit_use_double_quant=True,
     bnb_4bit_quant_type="nf4",
     bnb_4bit_compute_dtype=torch.bfloat16
-)
+) if os.getenv("LOAD_IN_4BIT", "1") == "1" else None
 
 base_model = AutoModelForCausalLM.from_pretrained(base_model_id, torch_dtype=torch.float16, quantization_config=bnb_config,  device_map='auto')
 app.logger.info("Base model loaded!!")
-app.logger.info(base_model)
+app.logger.debug(base_model)
 
-model = PeftModel.from_pretrained(base_model, './model-assets')
+model = PeftModel.from_pretrained(base_model, model_assets)
 app.logger.info("PEFT model loaded!!")
-app.logger.info(model)
+app.logger.debug(model)
 
 # Make sure the model is in evaluation mode
 model.eval()
 
+# Optional speculative (assisted) decoding: a small draft model sharing the tokenizer, e.g.
+# meta-llama/Llama-3.2-1B, proposes NUM_ASSISTANT_TOKENS tokens that the fine-tuned model
+# verifies in a single forward pass. Greedy output is unchanged. Disabled when unset.
+draft_model_id = os.getenv("DRAFT_MODEL_ID", "")
+num_assistant_tokens = int(os.getenv("NUM_ASSISTANT_TOKENS", 5))
+
+
+class ForwardCounter:
+    """Forward hook counting a model's forward passes"""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, module, args, output):
+        self.count += 1
+
+
+draft_model = None
+if draft_model_id:
+    draft_model = AutoModelForCausalLM.from_pretrained(draft_model_id, torch_dtype=torch.float16, device_map='auto')
+    if draft_model.config.vocab_size != base_model.config.vocab_size:
+        raise ValueError(f"Draft model {draft_model_id} does not share the tokenizer of {base_model_id}")
+    draft_model.generation_config.num_assistant_tokens = num_assistant_tokens
+    draft_model.eval()
+    app.logger.info("Draft model loaded!!")
+
+    # Every draft pass proposes one token; every target pass accepts some of them plus one
+    # token of its own, so accepted = generated - target passes
+    target_passes, draft_passes = ForwardCounter(), ForwardCounter()
+    base_model.register_forward_hook(target_passes)
+    draft_model.register_forward_hook(draft_passes)
+
 # Ensure pad_token_id is set
 if tokenizer.pad_token is None:
     tokenizer.pad_token = tokenizer.eos_token
 
+# One generate() at a time; waiting requests are counted as the queue
+model_lock = asyncio.Lock()
+
+# Warm-up before reporting ready: one generate() per prompt length and batch size, so the
+# first requests after a scale-out don't pay for kernel selection and allocator growth.
+# An empty WARMUP_PROMPT_TOKENS skips it.
+WARMUP_PROMPT_TOKENS = [int(n) for n in os.getenv("WARMUP_PROMPT_TOKENS", "16,128,512").split(",") if n.strip()]
+WARMUP_BATCH_SIZES = [int(n) for n in os.getenv("WARMUP_BATCH_SIZES", "1").split(",") if n.strip()]
+WARMUP_NEW_TOKENS = int(os.getenv("WARMUP_NEW_TOKENS", 16))
+WARMUP_TEXT = "Kubernetes schedules pods onto nodes based on their resource requests and limits. "
+
+ready = asyncio.Event()
+# Set if warm-up fails: /live then fails too, so the kubelet restarts the container
+warmup_failed = asyncio.Event()
+
+
+class FirstTokenTimer(BaseStreamer):
+    """Streamer that records when generate() produces its first new token"""
+
+    def __init__(self):
+        self.calls = 0
+        self.first_token_time = None
+
+    def put(self, value):
+        # The first call carries the prompt, the second the first new token
+        self.calls += 1
+        if self.calls == 2:
+            self.first_token_time = time.perf_counter()
+
+    def end(self):
+        pass
+
+
+def generate_sync(inputs, **generate_kwargs):
+    # Speculative decoding needs batch size 1; assistant_model=None turns it off for a call
+    if draft_model is not None and inputs["input_ids"].shape[0] == 1:
+        generate_kwargs.setdefault("assistant_model", draft_model)
+    # Grad mode is per thread, so disable it in the worker thread itself
+    with torch.no_grad():
+        return model.generate(**inputs, **generate_kwargs)
+
+
+def record_speculation(generated_tokens, target_forwards, proposed):
+    """Record draft tokens proposed and accepted during one generate() call"""
+    if proposed == 0:
+        return
+    accepted = max(0, generated_tokens - target_forwards)
+    DRAFT_TOKENS.inc(proposed)
+    ACCEPTED_TOKENS.inc(accepted)
+    ACCEPTANCE_RATE.observe(min(1.0, accepted / proposed))
+
+
+async def run_generate(inputs, request_start, **generate_kwargs):
+    """Run model.generate() off the event loop under the model lock and record its metrics"""
+    QUEUE_DEPTH.inc()
+    try:
+        await model_lock.acquire()
+    finally:
+        QUEUE_DEPTH.dec()
+    try:
+        streamer = FirstTokenTimer()
+        forwards_before = (target_passes.count, draft_passes.count) if draft_model is not None else None
+        generate_start = time.perf_counter()
+        outputs = await asyncio.to_thread(generate_sync, inputs, streamer=streamer, **generate_kwargs)
+        generate_time = time.perf_counter() - generate_start
+        if forwards_before is not None:
+            forwards = (target_passes.count - forwards_before[0], draft_passes.count - forwards_before[1])
+    finally:
+        model_lock.release()
+
+    batch_size, prompt_tokens = inputs["input_ids"].shape
+    generated_tokens = outputs.shape[1] - prompt_tokens
+    if forwards_before is not None:
+        record_speculation(generated_tokens, *forwards)
+    BATCH_SIZE.observe(batch_size)
+    PROMPT_TOKENS.observe(prompt_tokens)
+    GENERATED_TOKENS.observe(generated_tokens)
+    if streamer.first_token_time is not None:
+        TIME_TO_FIRST_TOKEN.observe(streamer.first_token_time - request_start)
+    if generate_time > 0:
+        TOKENS_PER_SECOND.observe(generated_tokens * batch_size / generate_time)
+    return outputs
+
+
+def warmup_inputs(prompt_tokens, batch_size):
+    """A batch of text prompts exactly prompt_tokens tokens long"""
+    ids = tokenizer(WARMUP_TEXT, return_tensors="pt")["input_ids"][0]
+    ids = ids.repeat(prompt_tokens // len(ids) + 1)[:prompt_tokens]
+    input_ids = ids.unsqueeze(0).repeat(batch_size, 1).to(device)
+    return {"input_ids": input_ids, "attention_mask": torch.ones_like(input_ids)}
+
+
+async def warm_up():
+    """Run the warm-up generations, then mark the server ready"""
+    start = time.perf_counter()
+    try:
+        async with model_lock:
+            for prompt_tokens in WARMUP_PROMPT_TOKENS:
+                for batch_size in WARMUP_BATCH_SIZES:
+                    await asyncio.to_thread(generate_sync, warmup_inputs(prompt_tokens, batch_size),
+                                            max_new_tokens=WARMUP_NEW_TOKENS, min_new_tokens=WARMUP_NEW_TOKENS,
+                                            pad_token_id=tokenizer.pad_token_id)
+    except Exception:
+        # Stay unready: a model that cannot generate should not receive traffic
+        app.logger.exception("Warm-up failed")
+        warmup_failed.set()
+        return
+    duration = time.perf_counter() - start
+    WARMUP_DURATION.set(duration)
+    READY.set(1)
+    ready.set()
+    app.logger.info(f"Warm-up finished in {duration:.1f}s, ready for traffic")
+
+
+@app.get("/live")
+async def live():
+    # Never touches the model, so a long generate() cannot fail the liveness probe
+    if warmup_failed.is_set():
+        return JSONResponse(status_code=503, content={"status": "warm-up failed"})
+    return {"status": "alive"}
+
+
+@app.get("/ready")
+async def readiness():
+    if not ready.is_set():
+        status = "warm-up failed" if warmup_failed.is_set() else "warming up"
+        return JSONResponse(status_code=503, content={"status": status})
+    return {"status": "ready"}
+
+
+@app.get("/metrics")
+def metrics():
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
+
 @app.post("/generate")
 async def generate(request: Request):
+    request_start = time.perf_counter()
+    status = 200
+    IN_FLIGHT.inc()
     try:
-        data = await request.json()
-    except Exception as e:
-        app.logger.error(f"Failed to parse JSON: {str(e)}")
-        return JSONResponse(status_code=400, content={"error": "Invalid JSON"})
-
-    app.logger.info("Request received - " + json.dumps(data))
-    
-    prompt = data.get('prompt', '')
-    
-    if not prompt:
-        return JSONResponse(status_code=400, content={"error": "No input text provided"})
-
-    # Tokenize the input and generate a response
-    inputs = tokenizer(prompt, return_tensors="pt").to(device)
-    
-    with torch.no_grad():
-        outputs = model.generate(
-            **inputs,
+        try:
+            data = await request.json()
+        except Exception as e:
+            app.logger.error(f"Failed to parse JSON: {str(e)}")
+            status = 400
+            return JSONResponse(status_code=400, content={"error": "Invalid JSON"})
+
+        app.logger.debug("Request received - " + json.dumps(data))
+
+        prompt = data.get('prompt', '')
+
+        if not prompt:
+            status = 400
+            return JSONResponse(status_code=400, content={"error": "No input text provided"})
+
+        # Tokenize the input and generate a response
+        inputs = tokenizer(prompt, return_tensors="pt").to(device)
+
+        outputs = await run_generate(
+            inputs,
+            request_start,
             # max_length=256,  # Adjust max length as needed
             max_new_tokens=100,
             repetition_penalty=1.15
         )
-    
-    # Decode the response and return it
-    response = tokenizer.decode(outputs[0], skip_special_tokens=True)
-    app.logger.info("Response::")
-    app.logger.info(response)
-    
-    return {"response": response}
+
+        # Decode the response and return it
+        response = tokenizer.decode(outputs[0], skip_special_tokens=True)
+        app.logger.debug("Response::")
+        app.logger.debug(response)
+
+        return {"response": response}
+    except Exception:
+        status = 500
+        raise
+    finally:
+        IN_FLIGHT.dec()
+        REQUESTS.labels(status=str(status)).inc()
+        REQUEST_LATENCY.observe(time.perf_counter() - request_start)
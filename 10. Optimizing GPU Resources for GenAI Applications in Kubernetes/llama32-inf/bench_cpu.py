@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+CPU inference benchmark
+
+Loads main.py in a fresh process for each mode (MODEL_DTYPE / TORCH_COMPILE)
+and measures load time, decode throughput and memory of generate() on CPU.
+float16 is the previous CPU path. By default a small random Llama model is
+generated first; pass --model to use a real checkpoint.
+
+Usage:
+    python bench_cpu.py
+    python bench_cpu.py --modes float16 bfloat16 int8 --new-tokens 64
+    python bench_cpu.py --model meta-llama/Llama-3.2-1B --threads 4
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+MODES = {
+    'float16': {'MODEL_DTYPE': 'float16'},
+    'float32': {'MODEL_DTYPE': 'float32'},
+    'bfloat16': {'MODEL_DTYPE': 'bfloat16'},
+    'int8': {'MODEL_DTYPE': 'int8'},
+    'bfloat16+compile': {'MODEL_DTYPE': 'bfloat16', 'TORCH_COMPILE': '1'},
+}
+# The shared tiny-model generator lives in the repository's bench/ directory
+BENCH_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'bench')
+PROMPT = "Kubernetes schedules pods onto nodes based on their resource requests and limits. " * 4
+
+
+def memory_mb():
+    """Current and peak resident set size of this process"""
+    values = {}
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith(('VmRSS:', 'VmHWM:')):
+                values[line.split(':')[0]] = round(int(line.split()[1]) / 1024, 1)
+    return values.get('VmRSS'), values.get('VmHWM')
+
+
+def weights_mb(model):
+    """Size of the model's tensors, including int8 packed weights"""
+    total = 0
+    for value in model.state_dict().values():
+        for tensor in value if isinstance(value, tuple) else (value,):
+            if hasattr(tensor, 'element_size'):
+                total += tensor.numel() * tensor.element_size()
+    return round(total / 2 ** 20, 1)
+
+
+def make_model(out, hidden_size, layers):
+    """Save the benchmark suite's random-weight Llama model (bench/stubs.py) under out/"""
+    sys.path.insert(0, BENCH_DIR)
+    from stubs import tiny_llama
+
+    model, tokenizer = tiny_llama(hidden_size, layers)
+    model.save_pretrained(out)
+    tokenizer.save_pretrained(out)
+    return out
+
+
+def worker(args):
+    """Runs in the child process: import the server module and time generate()"""
+    start = time.perf_counter()
+    import main
+    load_s = time.perf_counter() - start
+    rss_after_load, _ = memory_mb()
+
+    inputs = main.tokenizer(PROMPT, return_tensors='pt')
+    kwargs = {'max_new_tokens': args.new_tokens, 'min_new_tokens': args.new_tokens, 'do_sample': False,
+              'pad_token_id': main.tokenizer.pad_token_id}
+
+    start = time.perf_counter()
+    main.generate_sync(inputs, **kwargs)
+    first_s = time.perf_counter() - start
+
+    samples = []
+    for _ in range(args.repeat):
+        start = time.perf_counter()
+        main.generate_sync(inputs, **kwargs)
+        samples.append(time.perf_counter() - start)
+    samples.sort()
+    rss, peak_rss = memory_mb()
+    return {
+        'threads': main.torch.get_num_threads(),
+        'prompt_tokens': inputs['input_ids'].shape[1],
+        'load_s': round(load_s, 2),
+        'weights_mb': weights_mb(main.model),
+        'first_generate_s': round(first_s, 2),
+        'tokens_per_s': round(args.new_tokens / samples[len(samples) // 2], 1),
+        'rss_after_load_mb': rss_after_load,
+        'rss_mb': rss,
+        'peak_rss_mb': peak_rss,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the CPU inference modes of main.py")
+    parser.add_argument('--model', help="model id or path (default: a generated random model)")
+    parser.add_argument('--hidden-size', type=int, default=1024, help="size of the generated model")
+    parser.add_argument('--layers', type=int, default=8, help="layers of the generated model")
+    parser.add_argument('--modes', nargs='+', default=list(MODES), choices=list(MODES))
+    parser.add_argument('--new-tokens', type=int, default=32)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--threads', type=int, help="TORCH_NUM_THREADS (default: from the CPU limit)")
+    parser.add_argument('--worker', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(worker(args)))
+        return
+
+    here = os.path.dirname(os.path.abspath(__file__))
+    with tempfile.TemporaryDirectory() as tmpdir:
+        model = args.model or make_model(os.path.join(tmpdir, 'model'), args.hidden_size, args.layers)
+        for mode in args.modes:
+            # CUDA_VISIBLE_DEVICES="" keeps main.py on the CPU path even on a GPU host
+            env = dict(os.environ, MODEL_ID=model, CUDA_VISIBLE_DEVICES='', **MODES[mode])
+            if args.threads:
+                env['TORCH_NUM_THREADS'] = str(args.threads)
+            command = [sys.executable, os.path.abspath(__file__), '--worker',
+                       '--new-tokens', str(args.new_tokens), '--repeat', str(args.repeat)]
+            result = subprocess.run(command, cwd=here, env=env, capture_output=True, text=True)
+            if result.returncode != 0:
+                print(json.dumps({'mode': mode, 'error': result.stderr.strip().splitlines()[-1:]}), flush=True)
+                continue
+            print(json.dumps({'mode': mode, **json.loads(result.stdout.strip().splitlines()[-1])}), flush=True)
+
+
+if __name__ == '__main__':
+    main()
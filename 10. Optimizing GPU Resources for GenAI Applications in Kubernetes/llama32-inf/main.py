@@ -1,57 +1,274 @@
 import torch
-from fastapi import FastAPI, Request
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request, Response
 from fastapi.responses import JSONResponse
 from transformers import AutoTokenizer, AutoModelForCausalLM
+from transformers.generation.streamers import BaseStreamer
+from prometheus_client import Counter, Gauge, Histogram, CONTENT_TYPE_LATEST, generate_latest
 import logging
 import json
+import os
 
-app = FastAPI()
+
+@asynccontextmanager
+async def lifespan(app):
+    # Warm up in the background so /live answers while the first generations run
+    warmup_task = asyncio.create_task(warm_up())
+    yield
+    warmup_task.cancel()
+
+
+app = FastAPI(lifespan=lifespan)
 
 logging.basicConfig(level=logging.INFO)
 app.logger = logging.getLogger("uvicorn")
 
+# Prometheus metrics, exposed on /metrics
+TOKEN_BUCKETS = (1, 8, 16, 32, 64, 128, 256, 512, 1024, 2048, 4096)
+REQUESTS = Counter("llm_requests_total", "Generation requests by HTTP status", ["status"])
+TIME_TO_FIRST_TOKEN = Histogram("llm_time_to_first_token_seconds", "Time from request arrival to the first generated token",
+                                buckets=(0.05, 0.1, 0.25, 0.5, 1, 2, 5, 10, 30, 60))
+REQUEST_LATENCY = Histogram("llm_request_duration_seconds", "Time from request arrival to the complete response",
+                            buckets=(0.1, 0.25, 0.5, 1, 2, 5, 10, 20, 30, 60, 120))
+PROMPT_TOKENS = Histogram("llm_prompt_tokens", "Prompt tokens per request", buckets=TOKEN_BUCKETS)
+GENERATED_TOKENS = Histogram("llm_generated_tokens", "Generated tokens per request", buckets=TOKEN_BUCKETS)
+TOKENS_PER_SECOND = Histogram("llm_generation_tokens_per_second", "Generated tokens per second of generate() time",
+                              buckets=(1, 2, 5, 10, 20, 50, 100, 200, 500, 1000))
+BATCH_SIZE = Histogram("llm_batch_size", "Sequences per generate() call", buckets=(1, 2, 4, 8, 16, 32, 64))
+IN_FLIGHT = Gauge("llm_requests_in_flight", "Requests being handled, queued or generating")
+QUEUE_DEPTH = Gauge("llm_queue_depth", "Requests waiting for the model")
+WARMUP_DURATION = Gauge("llm_warmup_duration_seconds", "Time spent on warm-up generations at startup")
+READY = Gauge("llm_ready", "1 once warm-up has finished and /ready reports the server ready")
+
 app.logger.info(torch.cuda.is_available())  # Should return True
 device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
 
-tokenizer = AutoTokenizer.from_pretrained("meta-llama/Llama-3.2-1B")
-model = AutoModelForCausalLM.from_pretrained("meta-llama/Llama-3.2-1B", torch_dtype=torch.float16)
+# Model to serve (overridable, e.g. to point the benchmarks at a tiny local model)
+model_id = os.getenv("MODEL_ID", "meta-llama/Llama-3.2-1B")
+
+# Weights precision: float16 on GPU. On CPU, where float16 matmuls are very slow, bfloat16 by
+# default, or int8 (dynamic quantization of the Linear layers) for the smallest footprint.
+MODEL_DTYPE = os.getenv("MODEL_DTYPE", "float16" if device.type == "cuda" else "bfloat16")
+MODEL_DTYPES = ("float16", "bfloat16", "float32", "int8")
+
+# Compile the forward pass and decode with a fixed-size (static) KV cache
+TORCH_COMPILE = os.getenv("TORCH_COMPILE", "0") == "1"
+
+
+def cpu_limit():
+    """Return the CPU limit of the container, falling back to the host CPU count"""
+    try:
+        # cgroup v2: "<quota> <period>" or "max <period>"
+        with open('/sys/fs/cgroup/cpu.max') as f:
+            quota, period = f.read().split()
+        if quota != 'max':
+            return int(quota) / int(period)
+    except (OSError, ValueError):
+        try:
+            # cgroup v1
+            with open('/sys/fs/cgroup/cpu/cpu.cfs_quota_us') as f:
+                quota = int(f.read())
+            with open('/sys/fs/cgroup/cpu/cpu.cfs_period_us') as f:
+                period = int(f.read())
+            if quota > 0:
+                return quota / period
+        except (OSError, ValueError):
+            pass
+    return os.cpu_count() or 1
+
+
+def load_model(model_id, dtype):
+    if dtype not in MODEL_DTYPES:
+        raise ValueError(f"MODEL_DTYPE must be one of {', '.join(MODEL_DTYPES)}, got {dtype!r}")
+    if dtype == "int8":
+        if device.type != "cpu":
+            raise ValueError("MODEL_DTYPE=int8 is only supported on CPU")
+        # Weights stored as int8, activations quantized on the fly per batch
+        model = AutoModelForCausalLM.from_pretrained(model_id, torch_dtype=torch.float32)
+        return torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8, inplace=True)
+    return AutoModelForCausalLM.from_pretrained(model_id, torch_dtype=getattr(torch, dtype))
+
 
-app.logger.info("Model loaded!!")
-app.logger.info(model)
+if device.type == "cpu":
+    # torch sizes its thread pool from the host's cores, not the pod's CPU limit;
+    # oversubscribing a throttled container makes every matmul slower
+    torch.set_num_threads(int(os.getenv("TORCH_NUM_THREADS", max(1, int(cpu_limit())))))
+    app.logger.info(f"Using {torch.get_num_threads()} CPU threads")
+
+tokenizer = AutoTokenizer.from_pretrained(model_id)
+model = load_model(model_id, MODEL_DTYPE)
+
+app.logger.info(f"Model loaded!! ({MODEL_DTYPE})")
+app.logger.debug(model)
 
 # Make sure the model is in evaluation mode
 model.to(device)
 model.eval()
 
+if TORCH_COMPILE:
+    # The static cache keeps decode-step shapes fixed, so the compiled graph is reused.
+    # No dynamic=True: that would trace symbolic shapes and give up the fixed-shape kernels
+    model.generation_config.cache_implementation = "static"
+    model.forward = torch.compile(model.forward)
+
 # Ensure pad_token_id is set
 if tokenizer.pad_token is None:
     tokenizer.pad_token = tokenizer.eos_token
 
+# One generate() at a time; waiting requests are counted as the queue
+model_lock = asyncio.Lock()
+
+# Warm-up before reporting ready: one generate() per prompt length and batch size, so the
+# first requests after a scale-out don't pay for kernel selection and allocator growth.
+# An empty WARMUP_PROMPT_TOKENS skips it.
+WARMUP_PROMPT_TOKENS = [int(n) for n in os.getenv("WARMUP_PROMPT_TOKENS", "16,64,128").split(",") if n.strip()]
+WARMUP_BATCH_SIZES = [int(n) for n in os.getenv("WARMUP_BATCH_SIZES", "1").split(",") if n.strip()]
+WARMUP_NEW_TOKENS = int(os.getenv("WARMUP_NEW_TOKENS", 16))
+WARMUP_TEXT = "Kubernetes schedules pods onto nodes based on their resource requests and limits. "
+
+ready = asyncio.Event()
+# Set if warm-up fails: /live then fails too, so the kubelet restarts the container
+warmup_failed = asyncio.Event()
+
+
+class FirstTokenTimer(BaseStreamer):
+    """Streamer that records when generate() produces its first new token"""
+
+    def __init__(self):
+        self.calls = 0
+        self.first_token_time = None
+
+    def put(self, value):
+        # The first call carries the prompt, the second the first new token
+        self.calls += 1
+        if self.calls == 2:
+            self.first_token_time = time.perf_counter()
+
+    def end(self):
+        pass
+
+
+def generate_sync(inputs, **generate_kwargs):
+    # Grad mode is per thread, so disable it in the worker thread itself
+    with torch.inference_mode():
+        return model.generate(**inputs, **generate_kwargs)
+
+
+async def run_generate(inputs, request_start, **generate_kwargs):
+    """Run model.generate() off the event loop under the model lock and record its metrics"""
+    QUEUE_DEPTH.inc()
+    try:
+        await model_lock.acquire()
+    finally:
+        QUEUE_DEPTH.dec()
+    try:
+        streamer = FirstTokenTimer()
+        generate_start = time.perf_counter()
+        outputs = await asyncio.to_thread(generate_sync, inputs, streamer=streamer, **generate_kwargs)
+        generate_time = time.perf_counter() - generate_start
+    finally:
+        model_lock.release()
+
+    batch_size, prompt_tokens = inputs["input_ids"].shape
+    generated_tokens = outputs.shape[1] - prompt_tokens
+    BATCH_SIZE.observe(batch_size)
+    PROMPT_TOKENS.observe(prompt_tokens)
+    GENERATED_TOKENS.observe(generated_tokens)
+    if streamer.first_token_time is not None:
+        TIME_TO_FIRST_TOKEN.observe(streamer.first_token_time - request_start)
+    if generate_time > 0:
+        TOKENS_PER_SECOND.observe(generated_tokens * batch_size / generate_time)
+    return outputs
+
+
+def warmup_inputs(prompt_tokens, batch_size):
+    """A batch of text prompts exactly prompt_tokens tokens long"""
+    ids = tokenizer(WARMUP_TEXT, return_tensors="pt")["input_ids"][0]
+    ids = ids.repeat(prompt_tokens // len(ids) + 1)[:prompt_tokens]
+    input_ids = ids.unsqueeze(0).repeat(batch_size, 1).to(device)
+    return {"input_ids": input_ids, "attention_mask": torch.ones_like(input_ids)}
+
+
+async def warm_up():
+    """Run the warm-up generations, then mark the server ready"""
+    start = time.perf_counter()
+    try:
+        async with model_lock:
+            for prompt_tokens in WARMUP_PROMPT_TOKENS:
+                for batch_size in WARMUP_BATCH_SIZES:
+                    await asyncio.to_thread(generate_sync, warmup_inputs(prompt_tokens, batch_size),
+                                            max_new_tokens=WARMUP_NEW_TOKENS, min_new_tokens=WARMUP_NEW_TOKENS,
+                                            pad_token_id=tokenizer.pad_token_id)
+    except Exception:
+        # Stay unready: a model that cannot generate should not receive traffic
+        app.logger.exception("Warm-up failed")
+        warmup_failed.set()
+        return
+    duration = time.perf_counter() - start
+    WARMUP_DURATION.set(duration)
+    READY.set(1)
+    ready.set()
+    app.logger.info(f"Warm-up finished in {duration:.1f}s, ready for traffic")
+
+
+@app.get("/live")
+async def live():
+    # Never touches the model, so a long generate() cannot fail the liveness probe
+    if warmup_failed.is_set():
+        return JSONResponse(status_code=503, content={"status": "warm-up failed"})
+    return {"status": "alive"}
+
+
+@app.get("/ready")
+async def readiness():
+    if not ready.is_set():
+        status = "warm-up failed" if warmup_failed.is_set() else "warming up"
+        return JSONResponse(status_code=503, content={"status": status})
+    return {"status": "ready"}
+
+
+@app.get("/metrics")
+def metrics():
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
+
 @app.post("/generate")
 async def generate(request: Request):
-    
-    app.logger.info(f"Request received: {request}")
-    
-    data = await request.json()
-    
-    prompt = data.get('prompt', '')
-    
-    if not prompt:
-        return JSONResponse(status_code=400, content={"error": "No input text provided"})
-
-    # Tokenize the input and generate a response
-    inputs = tokenizer(prompt, return_tensors="pt").to(device)
-    
-    with torch.no_grad():
-        outputs = model.generate(
-            **inputs,
+    request_start = time.perf_counter()
+    status = 200
+    IN_FLIGHT.inc()
+    try:
+        app.logger.debug(f"Request received: {request}")
+
+        data = await request.json()
+
+        prompt = data.get('prompt', '')
+
+        if not prompt:
+            status = 400
+            return JSONResponse(status_code=400, content={"error": "No input text provided"})
+
+        # Tokenize the input and generate a response
+        inputs = tokenizer(prompt, return_tensors="pt").to(device)
+
+        outputs = await run_generate(
+            inputs,
+            request_start,
             max_length=256,  # Adjust max length as needed
         )
-    
-    # Decode the response and return it
-    response = tokenizer.decode(outputs[0], skip_special_tokens=True)
-    app.logger.info("Response::")
-    app.logger.info(response)
-    
-    return {"response": response}
 
+        # Decode the response and return it
+        response = tokenizer.decode(outputs[0], skip_special_tokens=True)
+        app.logger.debug("Response::")
+        app.logger.debug(response)
+
+        return {"response": response}
+    except Exception:
+        status = 500
+        raise
+    finally:
+        IN_FLIGHT.dec()
+        REQUESTS.labels(status=str(status)).inc()
+        REQUEST_LATENCY.observe(time.perf_counter() - request_start)
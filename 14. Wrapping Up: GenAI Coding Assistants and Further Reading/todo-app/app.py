@@ -6,17 +6,39 @@ This application provides a RESTful API for managing tasks with the following fe
 - Create new tasks with title and description
 - Mark tasks as complete/incomplete
 - Delete tasks
-- View all tasks
+- View all tasks, paginated and filtered by status
+
+Tasks are kept in the store selected by TASK_STORE (see storage.py).
 """
 
 from flask import Flask, request, jsonify, render_template
-import uuid
 import os
 
+from storage import create_store
+
 app = Flask(__name__)
 
-# In-memory storage for tasks
-tasks = {}
+# Task storage (in-memory by default, SQLite when TASK_STORE=sqlite)
+store = create_store()
+
+# Page size for GET /api/tasks
+DEFAULT_PAGE_SIZE = int(os.environ.get('TASKS_PAGE_SIZE', 100))
+MAX_PAGE_SIZE = int(os.environ.get('TASKS_MAX_PAGE_SIZE', 1000))
+
+# Expected JSON type of each writable task field
+FIELD_TYPES = {'title': str, 'description': str, 'completed': bool}
+
+def invalid_fields(data):
+    """Return an error message for task fields of the wrong type, or None"""
+    for field, expected in FIELD_TYPES.items():
+        if field in data and not isinstance(data[field], expected):
+            return f"{field} must be a {'boolean' if expected is bool else 'string'}"
+    return None
+
+@app.route('/healthz')
+def healthz():
+    """Liveness/readiness probe, does not touch the task store"""
+    return 'ok', 200, {'Content-Type': 'text/plain', 'Cache-Control': 'no-store'}
 
 @app.route('/')
 def index():
@@ -25,8 +47,39 @@ def index():
 
 @app.route('/api/tasks', methods=['GET'])
 def get_tasks():
-    """Return all tasks"""
-    return jsonify(list(tasks.values()))
+    """Return a page of tasks in creation order
+
+    Query parameters: limit, offset and status (all, completed, active).
+    Responds with 304 when the If-None-Match ETag is still current.
+    """
+    status = request.args.get('status', 'all')
+    if status not in ('all', 'completed', 'active'):
+        return jsonify({"error": "status must be one of all, completed, active"}), 400
+    try:
+        limit = int(request.args.get('limit', DEFAULT_PAGE_SIZE))
+        offset = int(request.args.get('offset', 0))
+    except ValueError:
+        return jsonify({"error": "limit and offset must be integers"}), 400
+    if limit < 1 or offset < 0:
+        return jsonify({"error": "limit must be positive and offset non-negative"}), 400
+    limit = min(limit, MAX_PAGE_SIZE)
+
+    completed = None if status == 'all' else status == 'completed'
+
+    def page_etag(version):
+        return f"{version}-{status}-{limit}-{offset}"
+
+    # Cheap version check first, so unchanged pages are never serialized
+    etag = page_etag(store.version())
+    if request.if_none_match.contains(etag):
+        response = app.response_class(status=304)
+        response.set_etag(etag)
+        return response
+
+    version, page = store.list_tasks(completed=completed, limit=limit, offset=offset)
+    response = jsonify(page)
+    response.set_etag(page_etag(version))
+    return response
 
 @app.route('/api/tasks', methods=['POST'])
 def create_task():
@@ -34,24 +87,19 @@ def create_task():
     data = request.get_json()
     
     # Validate input
-    if not data or 'title' not in data:
+    if not isinstance(data, dict) or 'title' not in data:
         return jsonify({"error": "Title is required"}), 400
+    error = invalid_fields(data)
+    if error:
+        return jsonify({"error": error}), 400
     
-    task_id = str(uuid.uuid4())
-    new_task = {
-        'id': task_id,
-        'title': data['title'],
-        'description': data.get('description', ''),
-        'completed': False
-    }
-    
-    tasks[task_id] = new_task
+    new_task = store.create_task(data['title'], data.get('description', ''))
     return jsonify(new_task), 201
 
 @app.route('/api/tasks/<task_id>', methods=['GET'])
 def get_task(task_id):
     """Get a specific task by ID"""
-    task = tasks.get(task_id)
+    task = store.get_task(task_id)
     if not task:
         return jsonify({"error": "Task not found"}), 404
     return jsonify(task)
@@ -59,33 +107,31 @@ def get_task(task_id):
 @app.route('/api/tasks/<task_id>', methods=['PUT'])
 def update_task(task_id):
     """Update a task's status"""
-    if task_id not in tasks:
-        return jsonify({"error": "Task not found"}), 404
-    
-    data = request.get_json()
-    task = tasks[task_id]
-    
+    data = request.get_json() or {}
+    if not isinstance(data, dict):
+        return jsonify({"error": "Expected a JSON object"}), 400
+    error = invalid_fields(data)
+    if error:
+        return jsonify({"error": error}), 400
+
     # Update task properties if provided
-    if 'title' in data:
-        task['title'] = data['title']
-    if 'description' in data:
-        task['description'] = data['description']
-    if 'completed' in data:
-        task['completed'] = data['completed']
-    
+    task = store.update_task(task_id, data)
+    if not task:
+        return jsonify({"error": "Task not found"}), 404
+
     return jsonify(task)
 
 @app.route('/api/tasks/<task_id>', methods=['DELETE'])
 def delete_task(task_id):
     """Delete a task"""
-    if task_id not in tasks:
+    if not store.delete_task(task_id):
         return jsonify({"error": "Task not found"}), 404
-    
-    del tasks[task_id]
+
     return jsonify({"message": "Task deleted"}), 200
 
 if __name__ == '__main__':
     # Use environment variable for port or default to 5000
     port = int(os.environ.get('PORT', 5000))
-    # Set host to 0.0.0.0 to make it accessible from outside the container
-    app.run(host='0.0.0.0', port=port, debug=True)
+    # Set host to 0.0.0.0 to make it accessible from outside the container.
+    # This is the development server; in the container gunicorn serves the app (see gunicorn.conf.py)
+    app.run(host='0.0.0.0', port=port, debug=os.environ.get('FLASK_DEBUG') == '1')
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Task store benchmark
+
+Fills each storage backend with N tasks (a third of them completed) and
+measures the latency of creating a task and of listing a page of tasks:
+the first page, the first page of completed tasks and a page deep in the list.
+
+Usage:
+    python bench_store.py                      # 10k, 100k and 1M tasks
+    python bench_store.py --sizes 10000 --backends sqlite
+"""
+
+import argparse
+import json
+import os
+import statistics
+import tempfile
+import time
+
+from storage import MemoryTaskStore, SQLiteTaskStore
+
+
+def timed(fn, repeat):
+    """Return (p50, p99) latency of fn in milliseconds"""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return round(statistics.median(samples), 3), round(samples[min(len(samples) - 1, int(len(samples) * 0.99))], 3)
+
+
+def fill(store, size, batch=10000):
+    ids = []
+    for start in range(0, size, batch):
+        count = min(batch, size - start)
+        created = store.create_many((f"Task {start + i}", "benchmark task") for i in range(count))
+        ids.extend(task['id'] for task in created)
+    for task_id in ids[::3]:
+        store.update_task(task_id, {'completed': True})
+
+
+def bench(backend, size, page_size, repeat, tmpdir):
+    if backend == 'memory':
+        store = MemoryTaskStore()
+    else:
+        store = SQLiteTaskStore(os.path.join(tmpdir, f"bench-{size}.db"))
+
+    start = time.perf_counter()
+    fill(store, size)
+    fill_seconds = time.perf_counter() - start
+
+    counter = iter(range(10 ** 9))
+    results = {'backend': backend, 'tasks': size, 'fill_s': round(fill_seconds, 2)}
+    results['create_p50_ms'], results['create_p99_ms'] = timed(
+        lambda: store.create_task(f"New task {next(counter)}"), repeat)
+    results['list_first_page_p50_ms'], results['list_first_page_p99_ms'] = timed(
+        lambda: store.list_tasks(limit=page_size), repeat)
+    results['list_completed_p50_ms'], results['list_completed_p99_ms'] = timed(
+        lambda: store.list_tasks(completed=True, limit=page_size), repeat)
+    results['list_deep_page_p50_ms'], results['list_deep_page_p99_ms'] = timed(
+        lambda: store.list_tasks(limit=page_size, offset=size // 2), repeat)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the TODO task stores")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000, 1000000])
+    parser.add_argument('--backends', nargs='+', default=['memory', 'sqlite'], choices=['memory', 'sqlite'])
+    parser.add_argument('--page-size', type=int, default=100)
+    parser.add_argument('--repeat', type=int, default=200)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for size in args.sizes:
+            for backend in args.backends:
+                print(json.dumps(bench(backend, size, args.page_size, args.repeat, tmpdir)), flush=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,59 @@
+"""
+Gunicorn configuration for the TODO application
+
+Worker and thread counts are derived from the container CPU limit (cgroup
+quota) rather than the host CPU count, and can be overridden with
+WEB_CONCURRENCY and GUNICORN_THREADS.
+"""
+
+import math
+import os
+
+
+def cpu_limit():
+    """Return the CPU limit of the container, falling back to the host CPU count"""
+    try:
+        # cgroup v2: "<quota> <period>" or "max <period>"
+        with open('/sys/fs/cgroup/cpu.max') as f:
+            quota, period = f.read().split()
+        if quota != 'max':
+            return int(quota) / int(period)
+    except (OSError, ValueError):
+        try:
+            # cgroup v1
+            with open('/sys/fs/cgroup/cpu/cpu.cfs_quota_us') as f:
+                quota = int(f.read())
+            with open('/sys/fs/cgroup/cpu/cpu.cfs_period_us') as f:
+                period = int(f.read())
+            if quota > 0:
+                return quota / period
+        except (OSError, ValueError):
+            pass
+    return os.cpu_count() or 1
+
+
+bind = f"0.0.0.0:{os.environ.get('PORT', 5000)}"
+
+# One process per CPU of the limit; threads cover request I/O waits.
+# The in-memory store is per process, so it must run a single worker.
+worker_class = 'gthread'
+if os.environ.get('TASK_STORE', 'memory') == 'memory':
+    workers = 1
+else:
+    workers = int(os.environ.get('WEB_CONCURRENCY', max(1, math.ceil(cpu_limit()))))
+threads = int(os.environ.get('GUNICORN_THREADS', 4))
+
+# Load the app once in the master so workers fork with it already imported
+preload_app = True
+
+# Give in-flight requests time to finish on SIGTERM (below the pod's terminationGracePeriodSeconds)
+graceful_timeout = int(os.environ.get('GUNICORN_GRACEFUL_TIMEOUT', 20))
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 30))
+keepalive = 5
+
+# Heartbeat files on tmpfs, the container filesystem can stall workers (not available on e.g. macOS)
+if os.path.isdir('/dev/shm'):
+    worker_tmp_dir = '/dev/shm'
+
+accesslog = None
+errorlog = '-'
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Load test for the TODO REST API
+
+Runs a fixed number of client threads, each with its own keep-alive
+connection, against a running server for a fixed duration. The request mix
+is mostly list calls with some creates, reads and updates. Prints
+requests/second and latency percentiles as JSON.
+
+Usage:
+    gunicorn --config gunicorn.conf.py app:app &
+    python loadtest.py --url http://localhost:5000 --clients 32 --duration 30
+"""
+
+import argparse
+import http.client
+import json
+import random
+import threading
+import time
+from urllib.parse import urlparse
+
+# (weight, name) of the operations in the request mix
+REQUEST_MIX = [(70, 'list'), (15, 'create'), (10, 'get'), (5, 'update')]
+
+
+def percentile(ordered, q):
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))] if ordered else 0.0
+
+
+def client(url, deadline, results, known_ids, lock):
+    conn = http.client.HTTPConnection(url.hostname, url.port or 80, timeout=30)
+    headers = {'Content-Type': 'application/json'}
+    names = [name for _, name in REQUEST_MIX]
+    weights = [weight for weight, _ in REQUEST_MIX]
+    while time.perf_counter() < deadline:
+        op = random.choices(names, weights)[0]
+        task_id = random.choice(known_ids) if known_ids else None
+        if op == 'list' or task_id is None and op in ('get', 'update'):
+            op, method, path, body = 'list', 'GET', '/api/tasks?limit=50', None
+        elif op == 'create':
+            method, path, body = 'POST', '/api/tasks', json.dumps({'title': 'load test', 'description': 'x' * 64})
+        elif op == 'get':
+            method, path, body = 'GET', f'/api/tasks/{task_id}', None
+        else:
+            method, path, body = 'PUT', f'/api/tasks/{task_id}', json.dumps({'completed': random.random() < 0.5})
+
+        start = time.perf_counter()
+        try:
+            conn.request(method, path, body=body, headers=headers)
+            response = conn.getresponse()
+            payload = response.read()
+            ok = response.status < 400
+        except (OSError, http.client.HTTPException):
+            conn.close()
+            conn = http.client.HTTPConnection(url.hostname, url.port or 80, timeout=30)
+            ok, payload = False, b''
+        elapsed = time.perf_counter() - start
+
+        if ok and op == 'create':
+            with lock:
+                known_ids.append(json.loads(payload)['id'])
+        results.append((op, elapsed, ok))
+    conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the TODO REST API")
+    parser.add_argument('--url', default='http://localhost:5000')
+    parser.add_argument('--clients', type=int, default=32)
+    parser.add_argument('--duration', type=float, default=30, help="seconds")
+    args = parser.parse_args()
+
+    url = urlparse(args.url)
+    results, known_ids, lock = [], [], threading.Lock()
+    deadline = time.perf_counter() + args.duration
+    threads = [threading.Thread(target=client, args=(url, deadline, results, known_ids, lock))
+               for _ in range(args.clients)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    report = {'clients': args.clients, 'duration_s': round(elapsed, 1), 'requests': len(results),
+              'errors': sum(1 for _, _, ok in results if not ok),
+              'requests_per_s': round(len(results) / elapsed, 1)}
+    for op in [None] + [name for _, name in REQUEST_MIX]:
+        latencies = sorted(t for name, t, _ in results if op is None or name == op)
+        prefix = f"{op}_" if op else ''
+        report[f'{prefix}p50_ms'] = round(percentile(latencies, 0.50) * 1000, 2)
+        report[f'{prefix}p99_ms'] = round(percentile(latencies, 0.99) * 1000, 2)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,243 @@
+"""
+Task storage backends for the TODO application
+
+Two interchangeable stores are provided:
+- MemoryTaskStore: process-local, lost on restart (the original behaviour)
+- SQLiteTaskStore: persistent SQLite database in WAL mode
+
+Both keep tasks ordered by creation time, index them by completion status,
+are safe to use from multiple threads and expose a version that changes on
+every write (used for ETags). The version starts with a random per-store
+epoch, so two stores (pods, or one pod before and after a restart) never
+report the same version for different contents.
+"""
+
+import bisect
+import itertools
+import os
+import sqlite3
+import threading
+import time
+import uuid
+
+TASK_FIELDS = ('title', 'description', 'completed')
+
+
+class MemoryTaskStore:
+    """In-memory task store guarded by a lock"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._tasks = {}
+        self._seq = {}
+        self._order = []  # (seq, task_id) sorted by creation
+        self._by_status = {True: [], False: []}  # Same, per completion status
+        self._counter = itertools.count()
+        self._epoch = uuid.uuid4().hex
+        self._version = 0
+
+    def version(self):
+        return f"{self._epoch}.{self._version}"
+
+    def list_tasks(self, completed=None, limit=None, offset=0):
+        """Return (version, tasks) for one page in creation order"""
+        with self._lock:
+            index = self._order if completed is None else self._by_status[completed]
+            end = None if limit is None else offset + limit
+            return f"{self._epoch}.{self._version}", [dict(self._tasks[task_id]) for _, task_id in index[offset:end]]
+
+    def get_task(self, task_id):
+        with self._lock:
+            task = self._tasks.get(task_id)
+            return dict(task) if task else None
+
+    def create_task(self, title, description=''):
+        return self.create_many([(title, description)])[0]
+
+    def create_many(self, items):
+        """Create tasks from (title, description) pairs"""
+        created = []
+        with self._lock:
+            for title, description in items:
+                task = _new_task(title, description)
+                seq = next(self._counter)
+                self._tasks[task['id']] = task
+                self._seq[task['id']] = seq
+                self._order.append((seq, task['id']))
+                self._by_status[False].append((seq, task['id']))
+                created.append(dict(task))
+            self._version += 1
+        return created
+
+    def update_task(self, task_id, changes):
+        """Apply title/description/completed changes, return the task or None"""
+        with self._lock:
+            task = self._tasks.get(task_id)
+            if task is None:
+                return None
+            changes = _clean_changes(changes)
+            if 'completed' in changes and changes['completed'] != task['completed']:
+                key = (self._seq[task_id], task_id)
+                _remove_sorted(self._by_status[task['completed']], key)
+                bisect.insort(self._by_status[changes['completed']], key)
+            task.update(changes)
+            self._version += 1
+            return dict(task)
+
+    def delete_task(self, task_id):
+        with self._lock:
+            task = self._tasks.pop(task_id, None)
+            if task is None:
+                return False
+            key = (self._seq.pop(task_id), task_id)
+            _remove_sorted(self._order, key)
+            _remove_sorted(self._by_status[task['completed']], key)
+            self._version += 1
+            return True
+
+
+class SQLiteTaskStore:
+    """SQLite-backed task store, one connection per thread"""
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS tasks (
+            id TEXT PRIMARY KEY,
+            title TEXT NOT NULL,
+            description TEXT NOT NULL DEFAULT '',
+            completed INTEGER NOT NULL DEFAULT 0,
+            created_at REAL NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_tasks_created ON tasks (created_at);
+        CREATE INDEX IF NOT EXISTS idx_tasks_completed_created ON tasks (completed, created_at);
+        CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER NOT NULL);
+        INSERT OR IGNORE INTO meta (key, value) VALUES ('version', 0);
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        self._epoch = uuid.uuid4().hex
+        conn = self._conn()
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.executescript(self.SCHEMA)
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        # Connections must not be shared with forked worker processes
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def _write(self, conn, sql, params):
+        """Run a write and bump the version in one transaction"""
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            cursor = conn.execute(sql, params)
+            if cursor.rowcount:
+                conn.execute("UPDATE meta SET value = value + 1 WHERE key = 'version'")
+            conn.execute('COMMIT')
+            return cursor.rowcount
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+
+    def version(self):
+        version = self._conn().execute("SELECT value FROM meta WHERE key = 'version'").fetchone()[0]
+        return f"{self._epoch}.{version}"
+
+    def list_tasks(self, completed=None, limit=None, offset=0):
+        """Return (version, tasks) for one page in creation order"""
+        conn = self._conn()
+        sql = 'SELECT id, title, description, completed, created_at FROM tasks'
+        params = []
+        if completed is not None:
+            sql += ' WHERE completed = ?'
+            params.append(int(completed))
+        sql += ' ORDER BY created_at, rowid LIMIT ? OFFSET ?'
+        params += [-1 if limit is None else limit, offset]
+        conn.execute('BEGIN')  # Read the version and the page from one snapshot
+        try:
+            version = conn.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()[0]
+            tasks = [_row_to_task(row) for row in conn.execute(sql, params)]
+        finally:
+            conn.execute('COMMIT')
+        return f"{self._epoch}.{version}", tasks
+
+    def get_task(self, task_id):
+        row = self._conn().execute(
+            'SELECT id, title, description, completed, created_at FROM tasks WHERE id = ?', (task_id,)).fetchone()
+        return _row_to_task(row) if row else None
+
+    def create_task(self, title, description=''):
+        return self.create_many([(title, description)])[0]
+
+    def create_many(self, items):
+        """Create tasks from (title, description) pairs in one transaction"""
+        created = [_new_task(title, description) for title, description in items]
+        conn = self._conn()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            conn.executemany(
+                'INSERT INTO tasks (id, title, description, completed, created_at) VALUES (?, ?, ?, 0, ?)',
+                [(t['id'], t['title'], t['description'], t['created_at']) for t in created])
+            conn.execute("UPDATE meta SET value = value + 1 WHERE key = 'version'")
+            conn.execute('COMMIT')
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        return created
+
+    def update_task(self, task_id, changes):
+        """Apply title/description/completed changes, return the task or None"""
+        changes = _clean_changes(changes)
+        if changes:
+            assignments = ', '.join(f'{field} = ?' for field in changes)
+            values = [int(v) if field == 'completed' else v for field, v in changes.items()]
+            self._write(self._conn(), f'UPDATE tasks SET {assignments} WHERE id = ?', values + [task_id])
+        return self.get_task(task_id)
+
+    def delete_task(self, task_id):
+        return self._write(self._conn(), 'DELETE FROM tasks WHERE id = ?', (task_id,)) > 0
+
+
+def create_store():
+    """Build the store selected by the TASK_STORE environment variable"""
+    backend = os.environ.get('TASK_STORE', 'memory')
+    if backend == 'memory':
+        return MemoryTaskStore()
+    if backend == 'sqlite':
+        return SQLiteTaskStore(os.environ.get('TASK_DB_PATH', 'tasks.db'))
+    raise ValueError(f"Unknown TASK_STORE '{backend}', expected 'memory' or 'sqlite'")
+
+
+def _new_task(title, description):
+    return {
+        'id': str(uuid.uuid4()),
+        'title': title,
+        'description': description,
+        'completed': False,
+        'created_at': time.time()
+    }
+
+
+def _clean_changes(changes):
+    changes = {field: changes[field] for field in TASK_FIELDS if field in changes}
+    if 'completed' in changes:
+        changes['completed'] = bool(changes['completed'])
+    return changes
+
+
+def _row_to_task(row):
+    task = dict(row)
+    task['completed'] = bool(task['completed'])
+    return task
+
+
+def _remove_sorted(items, key):
+    i = bisect.bisect_left(items, key)
+    if i < len(items) and items[i] == key:
+        del items[i]
@@ -0,0 +1,73 @@
+"""
+Compare two benchmark result files and flag regressions.
+
+    python compare.py results/baseline.json results/current.json --threshold 0.10
+
+A scenario (service + request rate) regresses when latency percentiles or peak
+RSS grow, or throughput drops, by more than the relative threshold, or when
+the error rate rises by more than --max-error-increase. Exits with status 1
+if any scenario regressed.
+"""
+
+import argparse
+import json
+import sys
+
+# metric -> True when higher is worse
+METRICS = {
+    "p50_ms": True,
+    "p95_ms": True,
+    "p99_ms": True,
+    "peak_rss_mb": True,
+    "throughput_rps": False,
+}
+
+
+def scenario_key(result):
+    return result["service"], result.get("rate_rps")
+
+
+def compare(baseline, current, threshold=0.10, max_error_increase=0.01):
+    """Return (rows, regressed) comparing the results lists of two runs"""
+    baseline_by_key = {scenario_key(r): r for r in baseline["results"] if "skipped" not in r}
+    rows, regressed = [], False
+    for result in current["results"]:
+        base = baseline_by_key.get(scenario_key(result))
+        if base is None or "skipped" in result:
+            continue
+        for metric, higher_is_worse in METRICS.items():
+            old, new = base.get(metric), result.get(metric)
+            if not old or new is None:
+                continue
+            change = (new - old) / old
+            bad = change > threshold if higher_is_worse else change < -threshold
+            rows.append((result["service"], metric, old, new, change, bad))
+            regressed |= bad
+        old_errors, new_errors = base.get("error_rate", 0.0), result.get("error_rate", 0.0)
+        bad = new_errors - old_errors > max_error_increase
+        rows.append((result["service"], "error_rate", old_errors, new_errors, new_errors - old_errors, bad))
+        regressed |= bad
+    return rows, regressed
+
+
+def print_rows(rows):
+    print(f"{'service':<18}{'metric':<16}{'baseline':>12}{'current':>12}{'change':>10}")
+    for service, metric, old, new, change, bad in rows:
+        print(f"{service:<18}{metric:<16}{old:>12}{new:>12}{change:>+10.1%}{'  REGRESSION' if bad else ''}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("baseline")
+    parser.add_argument("current")
+    parser.add_argument("--threshold", type=float, default=0.10, help="allowed relative change (0.10 = 10%%)")
+    parser.add_argument("--max-error-increase", type=float, default=0.01, help="allowed absolute error rate increase")
+    args = parser.parse_args()
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.current) as f:
+        current = json.load(f)
+    rows, regressed = compare(baseline, current, args.threshold, args.max_error_increase)
+    print_rows(rows)
+    sys.exit(1 if regressed else 0)
@@ -0,0 +1,71 @@
+"""
+Start a RAG app with an in-memory Qdrant that has been seeded with the stub catalog.
+
+An in-memory Qdrant lives inside the app process, so it cannot be loaded from
+outside; this imports the app, fills the collection through the app's own
+embedding code (pointed at the stub server) and then serves it with uvicorn.
+
+    python launch.py rag-app --port 8001 --stub-url http://127.0.0.1:8900
+"""
+
+import argparse
+import asyncio
+import importlib.util
+import os
+import sys
+
+import uvicorn
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CHATBOT_APPS = os.path.join(REPO, "05. Working with GenAI on K8s: Chatbot Example", "app")
+
+
+def load_module(path, name):
+    sys.path.insert(0, os.path.dirname(path))
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def seed_rag_app(module, stub_url):
+    # OpenAIEmbeddings splits long inputs with tiktoken, which downloads its encoding from
+    # the internet on first use; the stub inputs are short, so send them unsplit instead.
+    for cls in (module.OpenAIEmbeddings, module.TimedOpenAIEmbeddings):
+        cls.model_fields["check_embedding_ctx_length"].default = False
+        cls.model_rebuild(force=True)
+
+    # Same path as POST /load_data: download the CSV, embed and store the chunks
+    asyncio.run(module.load_data(module.LoadDataModel(url=f"{stub_url}/catalog.csv")))
+
+
+def seed_bedrock_rag_app(module, stub_url):
+    from stubs import catalog_rows
+    from qdrant_client.http import models
+
+    module.client.recreate_collection(
+        collection_name=module.collection_name,
+        vectors_config=models.VectorParams(size=1024, distance=models.Distance.COSINE),
+    )
+    points = [models.PointStruct(id=int(row["ProductID"]), payload=row, vector=module.generate_embedding(row["Description"]))
+              for row in catalog_rows()]
+    module.client.upsert(collection_name=module.collection_name, points=points)
+
+
+APPS = {
+    "rag-app": (os.path.join(CHATBOT_APPS, "rag-app", "main.py"), seed_rag_app),
+    "bedrock-rag-app": (os.path.join(CHATBOT_APPS, "bedrock-rag-app", "bedrock.py"), seed_bedrock_rag_app),
+}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("app", choices=sorted(APPS))
+    parser.add_argument("--port", type=int, required=True)
+    parser.add_argument("--stub-url", required=True)
+    args = parser.parse_args()
+
+    path, seed = APPS[args.app]
+    module = load_module(path, args.app.replace("-", "_"))
+    seed(module, args.stub_url)
+    uvicorn.run(module.app, host="127.0.0.1", port=args.port, log_level="warning")
@@ -0,0 +1,67 @@
+"""
+Open-loop HTTP load generator.
+
+Requests are sent on a fixed schedule (Poisson or constant arrivals) whether or
+not earlier requests have completed, and latency is measured from the scheduled
+send time, so a slow server shows up as latency instead of a lower request rate.
+"""
+
+import asyncio
+import random
+
+import httpx
+
+
+def percentile(ordered, q):
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))] if ordered else None
+
+
+def summarize(samples, elapsed):
+    """Aggregate (latency_seconds, ok) samples into the benchmark metrics"""
+    latencies = sorted(latency for latency, ok in samples if ok)
+    errors = sum(1 for _, ok in samples if not ok)
+
+    def ms(value):
+        return None if value is None else round(value * 1000, 2)
+
+    return {
+        "requests": len(samples),
+        "errors": errors,
+        "error_rate": round(errors / len(samples), 4) if samples else 0.0,
+        "throughput_rps": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        "p50_ms": ms(percentile(latencies, 0.50)),
+        "p95_ms": ms(percentile(latencies, 0.95)),
+        "p99_ms": ms(percentile(latencies, 0.99)),
+    }
+
+
+async def open_loop(base_url, make_request, rate, duration, timeout=120.0, poisson=True, seed=0):
+    """Send make_request(i) -> (method, path, json_body) at `rate` per second for `duration` seconds"""
+    rng = random.Random(seed)
+    loop = asyncio.get_running_loop()
+    samples = []
+    limits = httpx.Limits(max_connections=None, max_keepalive_connections=100)
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=timeout, limits=limits) as client:
+        async def send(i, scheduled):
+            method, path, body = make_request(i)
+            try:
+                response = await client.request(method, path, json=body)
+                ok = response.status_code < 400
+            except httpx.HTTPError:
+                ok = False
+            samples.append((loop.time() - scheduled, ok))
+
+        start = loop.time()
+        scheduled = start
+        tasks = []
+        while scheduled < start + duration:
+            delay = scheduled - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            tasks.append(asyncio.create_task(send(len(tasks), scheduled)))
+            scheduled += rng.expovariate(rate) if poisson else 1.0 / rate
+        await asyncio.gather(*tasks)
+        elapsed = loop.time() - start
+
+    return summarize(samples, elapsed)
@@ -0,0 +1,272 @@
+"""
+Benchmark the serving apps against local stand-ins.
+
+Each selected service is started as its own process against local stand-ins
+(tiny random-weight models, in-memory Qdrant, a fake OpenAI/Bedrock server),
+driven with an open-loop load generator, then stopped. Results are written as
+JSON and can be checked against a baseline run.
+
+    python run.py                                        # all services, default rates
+    python run.py --services todo-app llama32-inf --duration 30
+    python run.py --output results/new.json --baseline results/old.json --threshold 0.1
+"""
+
+import argparse
+import asyncio
+import datetime
+import json
+import os
+import platform
+import signal
+import socket
+import subprocess
+import sys
+import time
+
+import httpx
+
+from compare import compare, print_rows
+from loadgen import open_loop
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO = os.path.dirname(BENCH_DIR)
+CHAPTER_02 = os.path.join(REPO, "02. Kubernetes - Introduction and Integration with GenAI")
+CHAPTER_05 = os.path.join(REPO, "05. Working with GenAI on K8s: Chatbot Example")
+CHAPTER_10 = os.path.join(REPO, "10. Optimizing GPU Resources for GenAI Applications in Kubernetes")
+TODO_APP = os.path.join(REPO, "14. Wrapping Up: GenAI Coding Assistants and Further Reading", "todo-app")
+
+PROMPTS = [
+    "What is the loyalty program?",
+    "Recommend a product in category 3 under 50 dollars.",
+    "How many points do I earn for every dollar spent, and when do they expire?",
+    "Summarize the return policy for sale items in two sentences.",
+]
+SYSTEM_PROMPT = "You are a helpful, respectful, and honest assistant. Always answer briefly."
+
+
+def generate_request(i):
+    return "POST", "/generate", {"prompt": PROMPTS[i % len(PROMPTS)]}
+
+
+def predict_request(i):
+    return "POST", "/predict", {"prompt": PROMPTS[i % len(PROMPTS)], "sys_msg": SYSTEM_PROMPT, "max_tokens": 32}
+
+
+def todo_request(i):
+    if i % 5 == 0:
+        return "POST", "/api/tasks", {"title": f"Task {i}", "description": "benchmark"}
+    return "GET", "/api/tasks?limit=50", None
+
+
+def uvicorn_command(module):
+    return [sys.executable, "-m", "uvicorn", f"{module}:app", "--host", "127.0.0.1", "--port", "{port}", "--log-level", "warning"]
+
+
+# name -> how to start the service and what to send it. "needs" lists the stand-ins it uses.
+SERVICES = {
+    "inference": {
+        "cwd": os.path.join(CHAPTER_05, "inference"),
+        "command": uvicorn_command("main"),
+        "env": {"BASE_MODEL_ID": "{models}/tiny-llama", "MODEL_ASSETS": "{models}/tiny-llama-adapter", "LOAD_IN_4BIT": "0"},
+        "needs": {"models"}, "ready": "/ready", "request": generate_request, "rate": 2.0,
+    },
+    "llama32-inf": {
+        "cwd": os.path.join(CHAPTER_10, "llama32-inf"),
+        "command": uvicorn_command("main"),
+        "env": {"MODEL_ID": "{models}/tiny-llama"},
+        "needs": {"models"}, "ready": "/ready", "request": generate_request, "rate": 2.0,
+    },
+    "rag-app": {
+        "cwd": BENCH_DIR,
+        "command": [sys.executable, "launch.py", "rag-app", "--port", "{port}", "--stub-url", "{stub}"],
+        "env": {"QDRANT_ENDPOINT": ":memory:", "OPENAI_API_KEY": "bench", "OPENAI_BASE_URL": "{stub}/v1",
+                "OPENAI_API_BASE": "{stub}/v1", "LANGCHAIN_TRACING_V2": "false"},
+        "needs": {"stub"}, "ready": "/metrics", "request": generate_request, "rate": 10.0,
+    },
+    "bedrock-rag-app": {
+        "cwd": BENCH_DIR,
+        "command": [sys.executable, "launch.py", "bedrock-rag-app", "--port", "{port}", "--stub-url", "{stub}"],
+        "env": {"QDRANT_ENDPOINT": ":memory:", "AWS_ENDPOINT_URL_BEDROCK_RUNTIME": "{stub}", "AWS_DEFAULT_REGION": "us-east-1",
+                "AWS_ACCESS_KEY_ID": "bench", "AWS_SECRET_ACCESS_KEY": "bench"},
+        "needs": {"stub"}, "ready": "/metrics", "request": generate_request, "rate": 10.0,
+    },
+    "llama-cpp": {
+        "cwd": CHAPTER_02,
+        "command": [sys.executable, "app.py"],
+        "env": {"MODEL_PATH": "{gguf}", "PORT": "{port}"},
+        "needs": {"gguf"}, "ready": "/cache/stats", "request": predict_request, "rate": 1.0,
+    },
+    "todo-app": {
+        "cwd": TODO_APP,
+        "command": [sys.executable, "-m", "gunicorn", "--config", "gunicorn.conf.py", "app:app"],
+        "env": {"PORT": "{port}", "TASK_STORE": "memory"},
+        "needs": set(), "ready": "/healthz", "request": todo_request, "rate": 200.0,
+    },
+}
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def process_tree(pid):
+    """pid and all of its descendants (Linux /proc)"""
+    pids, i = [pid], 0
+    while i < len(pids):
+        try:
+            for task in os.listdir(f"/proc/{pids[i]}/task"):
+                with open(f"/proc/{pids[i]}/task/{task}/children") as f:
+                    pids.extend(int(child) for child in f.read().split())
+        except OSError:
+            pass
+        i += 1
+    return pids
+
+
+def peak_rss_mb(pid):
+    """Sum of the peak resident set size (VmHWM) of a process tree"""
+    total_kb = 0
+    for p in process_tree(pid):
+        try:
+            with open(f"/proc/{p}/status") as f:
+                total_kb += next(int(line.split()[1]) for line in f if line.startswith("VmHWM:"))
+        except (OSError, StopIteration):
+            pass
+    return round(total_kb / 1024, 1)
+
+
+def wait_ready(process, url, timeout):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"exited with status {process.returncode} during startup")
+        try:
+            if httpx.get(url, timeout=2).status_code < 500:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.5)
+    raise RuntimeError(f"not ready after {timeout}s")
+
+
+def stop(process):
+    if process.poll() is None:
+        os.killpg(process.pid, signal.SIGTERM)
+        try:
+            process.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            os.killpg(process.pid, signal.SIGKILL)
+            process.wait()
+
+
+def bench_service(name, spec, args, standins):
+    missing = [need for need in spec["needs"] if not standins.get(need)]
+    if missing:
+        return {"service": name, "skipped": f"missing stand-in: {', '.join(missing)}"}
+
+    port = free_port()
+    values = dict(standins, port=port)
+    command = [part.format(**values) for part in spec["command"]]
+    env = dict(os.environ, PYTHONUNBUFFERED="1", **{k: v.format(**values) for k, v in spec["env"].items()})
+    rate = args.rate or spec["rate"]
+
+    log = open(os.path.join(args.log_dir, f"{name}.log"), "w")
+    process = subprocess.Popen(command, cwd=spec["cwd"], env=env, stdout=log, stderr=subprocess.STDOUT,
+                               start_new_session=True)
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        started = time.monotonic()
+        wait_ready(process, base_url + spec["ready"], args.startup_timeout)
+        startup_s = round(time.monotonic() - started, 2)
+
+        # A few sequential requests so one-off initialization is not measured
+        for i in range(args.warmup):
+            method, path, body = spec["request"](i)
+            httpx.request(method, base_url + path, json=body, timeout=args.timeout)
+
+        result = asyncio.run(open_loop(base_url, spec["request"], rate, args.duration, args.timeout, seed=args.seed))
+        return {"service": name, "rate_rps": rate, "duration_s": args.duration, "startup_s": startup_s,
+                **result, "peak_rss_mb": peak_rss_mb(process.pid)}
+    except RuntimeError as e:
+        return {"service": name, "skipped": f"{e} (see {log.name})"}
+    finally:
+        stop(process)
+        log.close()
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO, capture_output=True, text=True).stdout.strip()
+    except OSError:
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--services", nargs="+", choices=sorted(SERVICES), default=sorted(SERVICES))
+    parser.add_argument("--rate", type=float, help="requests/second for every service (default: per service)")
+    parser.add_argument("--duration", type=float, default=20.0, help="seconds of load per service")
+    parser.add_argument("--warmup", type=int, default=3, help="sequential requests before measuring")
+    parser.add_argument("--timeout", type=float, default=120.0, help="per-request timeout in seconds")
+    parser.add_argument("--startup-timeout", type=float, default=300.0)
+    parser.add_argument("--stub-latency", type=float, default=0.05, help="latency of the fake OpenAI/Bedrock server")
+    parser.add_argument("--models-dir", default=os.path.join(BENCH_DIR, ".models"), help="where tiny models are generated")
+    parser.add_argument("--gguf", default=os.getenv("BENCH_GGUF"), help="small GGUF model for the llama.cpp app")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="results file (default: results/<timestamp>.json)")
+    parser.add_argument("--baseline", help="results file to compare against")
+    parser.add_argument("--threshold", type=float, default=0.10, help="allowed relative regression vs the baseline")
+    args = parser.parse_args()
+
+    timestamp = datetime.datetime.now().strftime("%Y%m%d-%H%M%S")
+    args.output = args.output or os.path.join(BENCH_DIR, "results", f"{timestamp}.json")
+    args.log_dir = os.path.join(BENCH_DIR, "results", "logs")
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    os.makedirs(args.log_dir, exist_ok=True)
+
+    needs = set().union(*(SERVICES[name]["needs"] for name in args.services))
+    standins = {"gguf": args.gguf}
+    stub = None
+    if "models" in needs:
+        from stubs import make_models
+        if not os.path.isdir(os.path.join(args.models_dir, "tiny-llama-adapter")):
+            make_models(args.models_dir)
+        standins["models"] = os.path.abspath(args.models_dir)
+    if "stub" in needs:
+        stub_port = free_port()
+        stub = subprocess.Popen([sys.executable, "stubs.py", "serve", "--port", str(stub_port), "--latency", str(args.stub_latency)],
+                                cwd=BENCH_DIR, start_new_session=True)
+        standins["stub"] = f"http://127.0.0.1:{stub_port}"
+
+    results = []
+    try:
+        for name in args.services:
+            result = bench_service(name, SERVICES[name], args, standins)
+            result["stub_latency_s"] = args.stub_latency if "stub" in SERVICES[name]["needs"] else None
+            print(json.dumps(result), flush=True)
+            results.append(result)
+    finally:
+        if stub:
+            stop(stub)
+
+    run = {
+        "meta": {"timestamp": timestamp, "git_revision": git_revision(), "python": platform.python_version(),
+                 "platform": platform.platform(), "cpus": os.cpu_count(),
+                 "args": {k: v for k, v in vars(args).items() if k not in ("output", "baseline", "log_dir")}},
+        "results": results,
+    }
+    with open(args.output, "w") as f:
+        json.dump(run, f, indent=2)
+    print(f"Results written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            rows, regressed = compare(json.load(f), run, args.threshold)
+        print_rows(rows)
+        sys.exit(1 if regressed else 0)
+
+
+if __name__ == "__main__":
+    main()
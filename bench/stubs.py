@@ -0,0 +1,172 @@
+"""
+Local stand-ins for the external dependencies of the serving apps.
+
+    python stubs.py serve --port 8900 --latency 0.05    # fake OpenAI + Bedrock + CSV file server
+    python stubs.py make-models --out .models           # tiny random-weight Llama models
+
+The fake server answers:
+- POST /v1/embeddings, /v1/chat/completions      (OpenAI API, used by rag-app)
+- POST /model/<model-id>/invoke                   (Bedrock runtime, used by bedrock-rag-app)
+- GET  /catalog.csv                               (product catalog for /load_data)
+every request after --latency seconds. Embeddings are deterministic per input text.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import random
+import re
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+CATALOG_SIZE = 200
+
+
+def fake_embedding(text, dimensions):
+    """Deterministic unit vector derived from the text"""
+    rng = random.Random(hashlib.sha256(str(text).encode()).digest())
+    vector = [rng.uniform(-1, 1) for _ in range(dimensions)]
+    norm = sum(v * v for v in vector) ** 0.5
+    return [v / norm for v in vector]
+
+
+def catalog_rows():
+    for i in range(CATALOG_SIZE):
+        yield {"ProductID": str(i + 1), "Name": f"Product {i + 1}",
+               "Description": f"Product {i + 1} is a sample item in category {i % 10} priced at {10 + i % 90} dollars."}
+
+
+def catalog_csv():
+    rows = ["ProductID,Name,Description"]
+    rows += [f'{r["ProductID"]},{r["Name"]},"{r["Description"]}"' for r in catalog_rows()]
+    return "\n".join(rows) + "\n"
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    latency = 0.0
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_json(self, payload, status=200):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        time.sleep(self.latency)
+        if self.path == "/catalog.csv":
+            body = catalog_csv().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/csv")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        else:
+            self.send_json({"status": "ok"})
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        data = json.loads(self.rfile.read(length) or b"{}")
+        time.sleep(self.latency)
+
+        if self.path.endswith("/embeddings"):
+            inputs = data["input"] if isinstance(data["input"], list) else [data["input"]]
+            dimensions = data.get("dimensions", 1536)
+            self.send_json({
+                "object": "list", "model": data.get("model", "stub"),
+                "data": [{"object": "embedding", "index": i, "embedding": fake_embedding(text, dimensions)}
+                         for i, text in enumerate(inputs)],
+                "usage": {"prompt_tokens": len(inputs), "total_tokens": len(inputs)},
+            })
+        elif self.path.endswith("/chat/completions"):
+            question = data["messages"][-1]["content"] if data.get("messages") else ""
+            self.send_json({
+                "id": "chatcmpl-stub", "object": "chat.completion", "created": int(time.time()),
+                "model": data.get("model", "stub"),
+                "choices": [{"index": 0, "finish_reason": "stop",
+                             "message": {"role": "assistant", "content": f"Stub answer to: {str(question)[:200]}"}}],
+                "usage": {"prompt_tokens": 1, "completion_tokens": 1, "total_tokens": 2},
+            })
+        elif re.match(r"^/model/[^/]+/invoke$", self.path):
+            if "titan-embed" in self.path:
+                self.send_json({"embedding": fake_embedding(data.get("inputText", ""), data.get("dimensions", 1024)),
+                                "inputTextTokenCount": 1})
+            else:
+                self.send_json({"id": "msg-stub", "type": "message", "role": "assistant",
+                                "content": [{"type": "text", "text": "Stub answer."}],
+                                "stop_reason": "end_turn", "usage": {"input_tokens": 1, "output_tokens": 1}})
+        else:
+            self.send_json({"error": f"unknown path {self.path}"}, status=404)
+
+
+def serve(port, latency):
+    StubHandler.latency = latency
+    server = ThreadingHTTPServer(("127.0.0.1", port), StubHandler)
+    server.daemon_threads = True
+    server.serve_forever()
+
+
+def tiny_llama(hidden_size=128, layers=2, vocab=1024, seed=0):
+    """Random-weight Llama model and a BPE tokenizer trained on the stub catalog"""
+    import torch
+    from tokenizers import Tokenizer, decoders, models, pre_tokenizers, trainers
+    from transformers import LlamaConfig, LlamaForCausalLM, PreTrainedTokenizerFast
+
+    tokenizer = Tokenizer(models.BPE())
+    tokenizer.pre_tokenizer = pre_tokenizers.ByteLevel(add_prefix_space=False)
+    tokenizer.decoder = decoders.ByteLevel()
+    trainer = trainers.BpeTrainer(vocab_size=vocab, special_tokens=["<s>", "</s>", "<unk>"],
+                                  initial_alphabet=pre_tokenizers.ByteLevel.alphabet())
+    tokenizer.train_from_iterator([row["Description"] for row in catalog_rows()], trainer)
+    tokenizer = PreTrainedTokenizerFast(tokenizer_object=tokenizer, bos_token="<s>", eos_token="</s>", unk_token="<unk>")
+
+    torch.manual_seed(seed)
+    # 32-dim heads with 2 queries per KV head; the defaults give the 2-layer, 128-wide benchmark model
+    config = LlamaConfig(vocab_size=len(tokenizer), hidden_size=hidden_size, intermediate_size=hidden_size * 2,
+                         num_hidden_layers=layers, num_attention_heads=hidden_size // 32,
+                         num_key_value_heads=hidden_size // 64, max_position_embeddings=1024,
+                         bos_token_id=tokenizer.bos_token_id, eos_token_id=tokenizer.eos_token_id)
+    return LlamaForCausalLM(config), tokenizer
+
+
+def make_models(out, seed=0, hidden_size=128, layers=2, vocab=1024):
+    """Write a tiny random Llama model, tokenizer and LoRA adapter under out/"""
+    from peft import LoraConfig, get_peft_model
+
+    base_dir, adapter_dir = os.path.join(out, "tiny-llama"), os.path.join(out, "tiny-llama-adapter")
+
+    model, tokenizer = tiny_llama(hidden_size, layers, vocab, seed)
+    model.save_pretrained(base_dir)
+    tokenizer.save_pretrained(base_dir)
+
+    # Same layout as inference/model-assets: adapter weights next to the tokenizer
+    adapter = get_peft_model(model, LoraConfig(r=4, target_modules=["q_proj", "v_proj"], task_type="CAUSAL_LM"))
+    adapter.save_pretrained(adapter_dir)
+    tokenizer.save_pretrained(adapter_dir)
+    return base_dir, adapter_dir
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+    serve_parser = commands.add_parser("serve")
+    serve_parser.add_argument("--port", type=int, default=8900)
+    serve_parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every response")
+    models_parser = commands.add_parser("make-models")
+    models_parser.add_argument("--out", default=".models")
+    models_parser.add_argument("--hidden-size", type=int, default=128)
+    models_parser.add_argument("--layers", type=int, default=2)
+    models_parser.add_argument("--vocab", type=int, default=1024, help="BPE vocabulary size (at most)")
+    args = parser.parse_args()
+
+    if args.command == "serve":
+        serve(args.port, args.latency)
+    else:
+        paths = make_models(args.out, hidden_size=args.hidden_size, layers=args.layers, vocab=args.vocab)
+        print(json.dumps(dict(zip(("base", "adapter"), paths))))